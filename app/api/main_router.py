@@ -5,10 +5,14 @@ from app.api.routers.class_ import router as class_router
 from app.api.routers.task import router as task_router
 from app.api.routers.card import router as card_router
 from app.api.routers.problem import router as problem_router
+from app.api.routers.judge import router as judge_router
+from app.api.routers.metrics import router as metrics_router
 main_router = APIRouter()
 
 main_router.include_router(user_router)
 main_router.include_router(class_router, prefix="/class", tags=["class"])
 main_router.include_router(task_router)
 main_router.include_router(card_router)
-main_router.include_router(problem_router)
\ No newline at end of file
+main_router.include_router(problem_router)
+main_router.include_router(judge_router, prefix="/judge", tags=["judge"])
+main_router.include_router(metrics_router, tags=["metrics"])
@@ -1,11 +1,11 @@
 from http import HTTPStatus
 from typing import List, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, Depends, Request, Response, HTTPException, Path
 from fastapi.params import Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.routers.utils import check_object_exists, check_name_duplicate, check_duplicate
+from app.api.routers.utils import check_category_parent, get_category_tree, check_object_exists, check_name_duplicate, check_duplicate
 from core.user_manager import current_user
 from db.session import get_async_session
 from requests.card import card_requests, card_task_requests
@@ -264,6 +264,21 @@ async def get_card_categories(
     return card_categories
 
 
+@router.get(
+    '/card_category/tree',
+    response_model=List[CardCategoryTree],
+    response_model_exclude_none=True,
+    tags=['card category']
+)
+async def get_card_category_tree(
+        request: Request,
+        response: Response,
+        counts: bool = Query(False),
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await get_category_tree(card_category_requests, counts, request, response, session=session)
+
+
 @router.get(
     '/card_category/{card_category_id}',
     response_model=CardCategoryRead,
@@ -306,6 +321,7 @@ async def update_card_category(
     card_category = await check_object_exists(id=card_category_id, requests=card_category_requests, session=session)
     if update_in.name is not None:
         await check_name_duplicate(name=update_in.name, requests=card_category_requests, session=session)
+    await check_category_parent(card_category, update_in.parent_category_id, requests=card_category_requests, session=session)
     card_category = await card_category_requests.update(card_category, update_in, session=session)
     return card_category
 
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+
+from typing import Dict, List
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemes.judge import CacheStatsRead, QueueLaneRead
+from db.session import get_async_session
+from judge import metrics
+from judge.cache import test_set_cache
+from judge.queue import get_queue_stats
+
+router = APIRouter()
+
+@router.get(
+    '/cache',
+    response_model=CacheStatsRead,
+)
+async def get_cache_stats():
+    return test_set_cache.stats()
+
+@router.get(
+    '/metrics',
+    response_model=Dict[str, float],
+)
+async def get_metrics():
+    return metrics.collect()
+
+@router.get(
+    '/queue',
+    response_model=List[QueueLaneRead],
+)
+async def get_queue(
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await get_queue_stats(session=session)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from judge import metrics
+
+router = APIRouter()
+
+@router.get(
+    '/metrics',
+    response_class=PlainTextResponse,
+)
+async def get_metrics():
+    # Текстовый формат Prometheus
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,18 +1,14 @@
-import os
-import subprocess
-import time
-import tempfile
-import random
 from http import HTTPStatus
 from typing import List, Optional, Union
 
-import psutil
 from fastapi.params import Query
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, Depends, Request, Response, File, Form, HTTPException, Path, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.routers.utils import check_object_exists, check_name_duplicate, check_duplicate
-from core.user_manager import current_user
+from app.api.routers.utils import check_category_parent, get_category_tree, check_object_exists, check_name_duplicate, check_duplicate
+from core.user_manager import current_user, current_superuser
 from db.session import get_async_session
+from judge.cache import test_set_cache
+from judge.queue import enqueue, enqueue_rejudge, get_rejudge_progress
 from app.schemes.problem import *
 from requests.problem import *
 
@@ -69,6 +65,7 @@ async def update_problem(
     if update_in.name is not None:
         await check_name_duplicate(requests=problem_requests, session=session, name=update_in.name)
     problem = await problem_requests.update(problem, update_in, session=session)
+    test_set_cache.invalidate(problem_id)
     return problem
 
 @router.delete(
@@ -82,8 +79,36 @@ async def delete_problem(
 ):
     problem = await check_object_exists(id=problem_id, session=session, requests=problem_requests)
     problem = await problem_requests.remove(problem, session=session)
+    test_set_cache.invalidate(problem_id)
     return problem
 
+@router.post(
+    '/problem/{problem_id}/rejudge',
+    response_model=RejudgeRead,
+    status_code=HTTPStatus.ACCEPTED,
+    tags=['problem']
+)
+async def rejudge_problem(
+        problem_id: int,
+        session: AsyncSession = Depends(get_async_session),
+        user: User = Depends(current_superuser),
+):
+    problem = await check_object_exists(id=problem_id, requests=problem_requests, session=session)
+    rejudge = await enqueue_rejudge(problem, session=session)
+    return await get_rejudge_progress(rejudge, session=session)
+
+@router.get(
+    '/rejudge/{rejudge_id}',
+    response_model=RejudgeRead,
+    tags=['problem']
+)
+async def get_rejudge(
+        rejudge_id: int,
+        session: AsyncSession = Depends(get_async_session),
+):
+    rejudge = await check_object_exists(id=rejudge_id, requests=rejudge_requests, session=session)
+    return await get_rejudge_progress(rejudge, session=session)
+
 @router.get(
     '/test/',
     response_model=List[TestRead],
@@ -118,6 +143,24 @@ async def create_test(
         session: AsyncSession = Depends(get_async_session),
 ):
     test = await test_requests.create(test_create, session=session)
+    test_set_cache.invalidate(test.problem_id)
+    return test
+
+@router.post(
+    '/test/upload',
+    response_model=TestRead,
+    tags=['test']
+)
+async def upload_test(
+        problem_id: int = Form(...),
+        input_file: UploadFile = File(...),
+        output_file: UploadFile = File(...),
+        session: AsyncSession = Depends(get_async_session),
+):
+    # Большие тесты загружаются файлами и хранятся в хранилище тестов
+    await check_object_exists(id=problem_id, requests=problem_requests, session=session)
+    test = await test_requests.create_from_files(problem_id, input_file.file, output_file.file, session=session)
+    test_set_cache.invalidate(problem_id)
     return test
 
 @router.patch(
@@ -131,7 +174,11 @@ async def update_test(
         session: AsyncSession = Depends(get_async_session),
 ):
     test = await check_object_exists(id=test_id, requests=test_requests, session=session)
+    if test_requests.get_changed_data(test, update_in.dict(exclude_unset=True)) and test_requests.is_file_backed(test):
+        raise HTTPException(400, detail="Test uploaded as files can only be replaced by a new upload")
+    test_set_cache.invalidate(test.problem_id)
     test = await test_requests.update(test, update_in, session=session)
+    test_set_cache.invalidate(test.problem_id)
 
     return test
 
@@ -146,6 +193,7 @@ async def delete_test(
 ):
     test = await check_object_exists(id=test_id, requests=test_requests, session=session)
     test = await test_requests.remove(test, session=session)
+    test_set_cache.invalidate(test.problem_id)
     return test
 
 @router.get(
@@ -160,6 +208,20 @@ async def get_problem_categories(
     problem_categories = await problem_category_requests.get_multi(session=session, parent_category_id=parent_category_id)
     return problem_categories
 
+@router.get(
+    '/problem_category/tree',
+    response_model=List[ProblemCategoryTree],
+    response_model_exclude_none=True,
+    tags=['problem category']
+)
+async def get_problem_category_tree(
+        request: Request,
+        response: Response,
+        counts: bool = Query(False),
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await get_category_tree(problem_category_requests, counts, request, response, session=session)
+
 @router.get(
     '/problem_category/{problem_category_id}',
     response_model=ProblemCategoryRead,
@@ -197,6 +259,7 @@ async def update_problem_category(
     problem_category = await check_object_exists(id=problem_category_id, requests=problem_category_requests, session=session)
     if update_in.name is not None:
         await check_name_duplicate(name=update_in.name, requests=problem_category_requests, session=session)
+    await check_category_parent(problem_category, update_in.parent_category_id, requests=problem_category_requests, session=session)
     problem_category = await problem_category_requests.update(problem_category, update_in, session=session)
     return problem_category
 
@@ -227,149 +290,40 @@ async def get_user_problem(
 
 @router.post(
     '/user_problem/',
+    response_model=SubmissionRead,
+    status_code=HTTPStatus.ACCEPTED,
     tags=['user problem']
 )
 async def create_user_problem(
         user_problem_create: UserProblemCreate,
         session: AsyncSession = Depends(get_async_session),
 ):
-    async def create():
-        problem_verdict = "OK"
-        attempt = await user_problem_requests.get_count_attempts(user_id=user_id, problem_id=problem_id, session=session)
-        attempt += 1
-        for test_result in tests_results:
-            await user_test_requests.create(
-                UserTestCreate(
-                    user_id=user_id,
-                    problem_id=problem_id,
-                    test_id=test_result['test_id'],
-                    verdict=test_result['verdict'],
-                    time=test_result['time'],
-                    memory=test_result['memory'],
-                    attempt=attempt,
-                    user_output=test_result['user_output']
-                ),
-                session=session
-            )
-            if test_result['verdict'] != problem_verdict and problem_verdict == "OK":
-                problem_verdict = test_result['verdict']
-
-        db_user_problem = await user_problem_requests.create(
-            UserProblemCreate(
-                user_id=user_id,
-                problem_id=problem_id,
-                solution=code,
-                verdict=problem_verdict,
-                attempt=attempt
-            ),
-            session=session
-        )
-
-        return db_user_problem
-
-    execution_time = memory_usage = 0
-    code = user_problem_create.solution
-    problem_id = user_problem_create.problem_id
-    user_id = user_problem_create.user_id
-    problem = await problem_requests.get(id=problem_id, session=session)
-    # Запрашиваем тесты для этой карточки
-    tests = await test_requests.get_multi(problem_id=problem_id, session=session)
-    tests_results = []
-    for test in tests:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".py") as temp_file:
-            temp_file.write(code.encode())
-            temp_file_path = temp_file.name
-
-        # Измеряем время выполнения и использование памяти
-        start_time = time.time()
-        process = psutil.Process(os.getpid())
-        memory_before = process.memory_info().rss
-
-        try:
-            # Выполняем код и получаем вывод
-            result = subprocess.run(["python", temp_file_path], input=test.input_data, text=True, capture_output=True,
-                                    timeout=problem.time_limit)
+    await check_object_exists(id=user_problem_create.problem_id, requests=problem_requests, session=session)
+    submission = await enqueue(user_problem_create, session=session)
+    return submission
 
-            if result.stderr:
-                os.remove(temp_file_path)
-                tests_results.append({
-                    'verdict': 'Ошибка компилятора',
-                    'time': 0,
-                    'memory': 0,
-                    'test_id': test.id,
-                    'user_output': 'Ответ отсутствует'
-                })
-                continue
-            output = result.stdout.strip()
-            execution_time = time.time() - start_time
-            memory_after = process.memory_info().rss
-            memory_usage = memory_after - memory_before
-
-            if output != test.output_data:
-                os.remove(temp_file_path)
-                tests_results.append({
-                    'verdict': 'Неверный ответ',
-                    'time': execution_time,
-                    'memory': memory_usage,
-                    'test_id': test.id,
-                    'user_output': output
-                })
-                continue
-
-            if execution_time > problem.time_limit:  # Предположим, что 1 секунда - это лимит времени
-                os.remove(temp_file_path)
-                tests_results.append({
-                    'verdict': 'Превышен лимит времени',
-                    'time': execution_time,
-                    'memory': memory_usage,
-                    'test_id': test.id,
-                    'user_output': 'Ответ отсутствует'
-                })
-                continue
-            elif memory_usage > problem.memory_limit:  # Примерное значение для 100 МБ
-                os.remove(temp_file_path)
-                tests_results.append({
-                    'verdict': 'Превышен лимит памяти',
-                    'time': execution_time,
-                    'memory': memory_usage,
-                    'test_id': test.id,
-                'user_output': 'Ответ отсутствует'
-                })
-                continue
-            tests_results.append({
-                'verdict': 'OK',
-                'time': execution_time,
-                'memory': memory_usage,
-                'test_id': test.id,
-                'user_output': output
-            })
-            os.remove(temp_file_path)
-
-        except subprocess.TimeoutExpired:
-            os.remove(temp_file_path)
-            tests_results.append({
-                'verdict': 'Превышен лимит времени',
-                'time': execution_time,
-                'memory': memory_usage,
-                'test_id': test.id,
-                'user_output': 'Ответ отсутствует'
-            })
-            continue
-
-        except subprocess.CalledProcessError:
-            os.remove(temp_file_path)
-            tests_results.append({
-                'verdict': 'Ошибка компилятора',
-                'time': 0,
-                'memory': 0,
-                'test_id': test.id,
-                'user_output': 'Ответ отсутствует'
-            })
-            continue
-
-    db_obj = await create()
-
-    return db_obj, tests_results
+@router.get(
+    '/user_problem/{submission_id}/status',
+    response_model=SubmissionStatusRead,
+    tags=['user problem']
+)
+async def get_user_problem_status(
+        submission_id: int,
+        session: AsyncSession = Depends(get_async_session),
+):
+    submission = await submission_requests.get(id=submission_id, session=session)
+    if submission is None:
+        raise HTTPException(404, detail="Submission not found")
+    tests_results = await submission_requests.get_tests_results(submission, session=session)
+    return {
+        'id': submission.id,
+        'status': submission.status,
+        'tests_total': submission.tests_total,
+        'tests_done': submission.tests_done,
+        'tests_results': tests_results,
+        'verdict': submission.verdict,
+        'user_problem_id': submission.user_problem_id,
+    }
 
 @router.delete(
     '/user_problem/',
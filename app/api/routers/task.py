@@ -2,10 +2,10 @@ from http import HTTPStatus
 
 from typing import List
 from fastapi.params import Query
-from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi import APIRouter, Depends, Request, Response, HTTPException, Path
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.routers.utils import check_object_exists, check_name_duplicate
+from app.api.routers.utils import check_category_parent, get_category_tree, check_object_exists, check_name_duplicate
 from db.session import get_async_session
 from requests.class_ import class_requests
 from app.schemes.task import *
@@ -116,6 +116,21 @@ async def get_task_categories(
     return task_categories
 
 
+@router.get(
+    '/task_category/tree',
+    response_model=List[TaskCategoryTree],
+    response_model_exclude_none=True,
+    tags=['task category']
+)
+async def get_task_category_tree(
+        request: Request,
+        response: Response,
+        counts: bool = Query(False),
+        session: AsyncSession = Depends(get_async_session),
+):
+    return await get_category_tree(task_category_requests, counts, request, response, session=session)
+
+
 @router.get(
     '/task_category/{task_category_id}',
     response_model=TaskCategoryRead,
@@ -159,6 +174,7 @@ async def update_task_category(
 
     if update_in.name is not None:
         await check_name_duplicate(name=update_in.name, requests=task_category_requests, session=session)
+    await check_category_parent(task_category, update_in.parent_category_id, requests=task_category_requests, session=session)
     task_category = await task_category_requests.update(task_category, update_in, session=session)
     return task_category
 
@@ -174,7 +190,7 @@ async def delete_task_category(
         session: AsyncSession = Depends(get_async_session),
 ):
     task_category = await check_object_exists(id=task_category_id, requests=task_category_requests, session=session)
-    task_category = await task_requests.remove(task_category, session=session)
+    task_category = await task_category_requests.remove(task_category, session=session)
     return task_category
 
 
@@ -1,6 +1,8 @@
+import hashlib
+import json
 from typing import Dict, Union, List
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.session import get_async_session
@@ -34,4 +36,40 @@ async def check_object_exists(
     obj = await requests.get(**kwargs, session=session)
     if obj is None or (isinstance(obj, list) and len(obj) == 0):
         raise HTTPException(status_code=400, detail="Object not found")
-    return obj
\ No newline at end of file
+    return obj
+
+async def check_category_parent(
+        category,
+        parent_category_id: int,
+        requests,
+        session: AsyncSession = Depends(get_async_session),
+) -> None:
+    # Категорию нельзя перенести внутрь её же поддерева - дерево стало бы циклом
+    if parent_category_id and await requests.is_in_subtree(parent_category_id, category.id, session=session):
+        raise HTTPException(status_code=400, detail="Category cannot be moved into its own subtree")
+
+
+async def get_category_tree(
+        requests,
+        counts: bool,
+        request: Request,
+        response: Response,
+        session: AsyncSession = Depends(get_async_session),
+):
+    # Без счётчиков ETag - версия дерева, и 304 отдаётся без чтения дерева.
+    # Счётчики меняются и без изменения категорий, поэтому тогда ETag - хэш ответа
+    if counts:
+        tree = await requests.get_tree(session=session, counts=True)
+        digest = hashlib.sha1(json.dumps(tree, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+        etag = f'"{digest}"'
+    else:
+        tree = None
+        etag = f'"{requests.model.__tablename__}-{await requests.get_tree_version(session=session)}"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if_none_match = request.headers.get('if-none-match', '')
+    if etag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(',')):
+        return Response(status_code=304, headers=headers)
+    if tree is None:
+        tree = await requests.get_tree(session=session)
+    response.headers.update(headers)
+    return tree
@@ -4,6 +4,7 @@ from starlette.middleware.cors import CORSMiddleware
 from app.api.main_router import main_router
 from core.config import settings
 from core.init_db import start_db
+from judge.worker import judge_worker
 
 app = FastAPI()
 app.include_router(main_router)
@@ -12,6 +13,12 @@ app.include_router(main_router)
 @app.on_event("startup")
 async def startup():
     await start_db()
+    judge_worker.start(settings.judge_queue_workers)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await judge_worker.stop()
 
 
 origins = [
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import Body
 from pydantic import BaseModel, Field
@@ -82,4 +82,13 @@ class CardCategoryUpdate(CardCategoryCreate):
     ...
 
 
+class CardCategoryTree(BaseModel):
+    id: int
+    name: str
+    level: int
+    items: Optional[int] = None
+    total_items: Optional[int] = None
+    children: List['CardCategoryTree'] = []
+
+
 
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+
+
+class CacheStatsRead(BaseModel):
+    entries: int
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+
+
+class QueueLaneRead(BaseModel):
+    lane: str
+    priority: int
+    queued: int
+    running: int
+    users: int
+    oldest_wait: float
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 
 from fastapi import Body
 from pydantic import BaseModel, Field
@@ -24,6 +24,18 @@ class ProblemCreate(BaseModel):
     time_limit: int = Field(
         ..., gt=0,
     )
+    output_limit: Optional[int] = Field(
+        None, gt=0,
+    )
+    checker: Literal['exact', 'tokens', 'float', 'lines'] = Field(
+        'exact',
+    )
+    checker_tolerance: Optional[float] = Field(
+        None, gt=0,
+    )
+    stop_on_first_failure: bool = Field(
+        False,
+    )
 
 
 class ProblemRead(ProblemCreate):
@@ -62,6 +74,15 @@ class ProblemCategoryUpdate(ProblemCategoryCreate):
     ...
 
 
+class ProblemCategoryTree(BaseModel):
+    id: int
+    name: str
+    level: int
+    items: Optional[int] = None
+    total_items: Optional[int] = None
+    children: List['ProblemCategoryTree'] = []
+
+
 class TestCreate(BaseModel):
     problem_id: int = Field(
         ..., gt=0,
@@ -132,4 +153,44 @@ class UserTestRead(UserTestCreate):
 
 
 class UserTestUpdate(UserTestCreate):
-    ...
\ No newline at end of file
+    ...
+
+
+class TestResultRead(BaseModel):
+    test_id: int
+    verdict: str
+    time: float
+    memory: float
+    user_output: Optional[str] = Field(None)
+
+    class Config:
+        orm_mode = True
+
+
+class SubmissionRead(BaseModel):
+    id: int
+    status: str
+
+    class Config:
+        orm_mode = True
+
+
+class SubmissionStatusRead(SubmissionRead):
+    tests_total: int
+    tests_done: int
+    tests_results: List[TestResultRead]
+    verdict: Optional[str] = Field(None)
+    user_problem_id: Optional[int] = Field(None)
+
+
+class RejudgeRead(BaseModel):
+    id: int
+    problem_id: int
+    created_at: datetime
+    tests_version: int
+    total: int
+    queued: int
+    running: int
+    done: int
+    failed: int
+    changed: int
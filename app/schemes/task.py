@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from fastapi import Body
 from pydantic import BaseModel, Field
@@ -46,6 +46,15 @@ class TaskCategoryUpdate(TaskCategoryCreate):
     ...
 
 
+class TaskCategoryTree(BaseModel):
+    id: int
+    name: str
+    level: int
+    items: Optional[int] = None
+    total_items: Optional[int] = None
+    children: List['TaskCategoryTree'] = []
+
+
 class DifficultyLevelCreate(BaseModel):
     name: str = Field(...)
 
@@ -0,0 +1,292 @@
+"""Замеры пропускной способности и задержки судьи.
+
+    python -m benchmarks.judge --mode both --submissions 40 --concurrency 4
+    python -m benchmarks.judge --scenario tiny --save baseline.json
+    python -m benchmarks.judge --scenario tiny --compare baseline.json
+
+База - отдельный файл SQLite в --work-dir, он пересоздаётся при каждом запуске
+вместе с хранилищем тестов benchmark_tests/ рядом; больше ничего в --work-dir
+не удаляется. Остальные настройки (JUDGE_*, .env) берутся как обычно.
+
+Режимы:
+    direct - judge_submission вызывается напрямую, --concurrency посылок сразу
+    http   - приложение поднимается в uvicorn, посылки идут через
+             POST /user_problem/ и опрос /user_problem/{id}/status; проверяют
+             JUDGE_QUEUE_WORKERS воркеров приложения
+
+Для каждой задачи выводятся посылки в секунду, задержка вердикта (p50/p95/p99)
+и накладные расходы судьи на тест: время посылки за вычетом времени решений
+(деленного на число параллельно идущих тестов) в расчёте на один тест. Это
+время создания рабочей папки, запуска процессов, чтения вывода, проверки и
+записи в базу; при --concurrency больше числа слотов в него входит и ожидание
+свободного слота.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from benchmarks.judge.scenarios import MEMORY_LIMIT, SCENARIOS, Scenario
+
+HTTP_POLL_INTERVAL = 0.01
+
+
+def percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def make_report(started: float, finished: float, samples: List[Dict]) -> Dict:
+    latencies = [sample['latency'] for sample in samples]
+    overheads = [sample['overhead'] for sample in samples if sample['overhead'] is not None]
+    return {
+        'submissions': len(samples),
+        'submissions_per_second': len(samples) / (finished - started),
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'overhead_per_test': sum(overheads) / len(overheads) if overheads else None,
+        'verdicts': dict(Counter(sample['verdict'] for sample in samples)),
+    }
+
+
+def get_overhead(latency: float, tests_results: List[Dict]) -> Optional[float]:
+    from core.config import settings
+
+    if not tests_results:
+        return None
+    parallelism = min(settings.judge_tests_parallelism, settings.judge_max_processes, len(tests_results))
+    solutions_time = sum(test_result['time'] for test_result in tests_results) / parallelism
+    return max(latency - solutions_time, 0) / len(tests_results)
+
+
+def get_solutions(scenario: Scenario, count: int) -> List[str]:
+    # Комментарий с номером делает посылки разными - иначе сработал бы кэш вердиктов
+    return [
+        f'{scenario.solutions[index % len(scenario.solutions)]}\n# {index}\n'
+        for index in range(count)
+    ]
+
+
+async def create_users(count: int) -> List[int]:
+    from db.session import async_session
+    from models.user import User
+
+    async with async_session() as session:
+        users = [
+            User(
+                email=f'bench-{index}-{time.time_ns()}@bench.local',
+                hashed_password='!',
+                last_name='Benchmark',
+                first_name=str(index),
+            )
+            for index in range(count)
+        ]
+        session.add_all(users)
+        await session.commit()
+        return [user.id for user in users]
+
+
+async def create_problem(scenario: Scenario) -> int:
+    from app.schemes.problem import ProblemCreate
+    from db.session import async_session
+    from requests.problem import problem_requests, test_requests
+
+    async with async_session() as session:
+        problem = await problem_requests.create(
+            ProblemCreate(
+                name=f'benchmark {scenario.name}',
+                description=scenario.description,
+                difficulty_level_id=1,
+                category_id=0,
+                memory_limit=MEMORY_LIMIT,
+                time_limit=scenario.time_limit,
+            ),
+            session=session,
+        )
+        for input_data, output_data in scenario.tests():
+            await test_requests.create_from_files(
+                problem.id, io.BytesIO(input_data), io.BytesIO(output_data), session=session
+            )
+        return problem.id
+
+
+async def run_direct(problem_id: int, users: List[int], solutions: List[str], concurrency: int) -> List[Dict]:
+    from app.schemes.problem import UserProblemCreate
+    from db.session import async_session
+    from judge.service import judge_submission
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def submit(index: int, solution: str) -> Dict:
+        async with semaphore:
+            started = time.perf_counter()
+            async with async_session() as session:
+                db_user_problem, tests_results = await judge_submission(
+                    UserProblemCreate(user_id=users[index % len(users)], problem_id=problem_id, solution=solution),
+                    session=session,
+                )
+            latency = time.perf_counter() - started
+        return {
+            'latency': latency,
+            'verdict': db_user_problem.verdict,
+            'overhead': get_overhead(latency, tests_results),
+        }
+
+    return await asyncio.gather(*(submit(index, solution) for index, solution in enumerate(solutions)))
+
+
+async def run_http(
+        base_url: str,
+        problem_id: int,
+        users: List[int],
+        solutions: List[str],
+        concurrency: int,
+) -> List[Dict]:
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def submit(client: httpx.AsyncClient, index: int, solution: str) -> Dict:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post('/user_problem/', json={
+                'user_id': users[index % len(users)],
+                'problem_id': problem_id,
+                'solution': solution,
+            })
+            response.raise_for_status()
+            submission_id = response.json()['id']
+            while True:
+                status = (await client.get(f'/user_problem/{submission_id}/status')).json()
+                if status['status'] in ('done', 'failed'):
+                    break
+                await asyncio.sleep(HTTP_POLL_INTERVAL)
+            latency = time.perf_counter() - started
+        return {
+            'latency': latency,
+            'verdict': status['verdict'] or status['status'],
+            'overhead': get_overhead(latency, status['tests_results']),
+        }
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        return await asyncio.gather(*(submit(client, index, solution) for index, solution in enumerate(solutions)))
+
+
+async def benchmark(args) -> Dict[str, Dict]:
+    from core.base import Base
+    from core.init_db import create_base_db
+    from db.session import engine
+    from judge.forkserver import fork_server
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    await create_base_db()
+    users = await create_users(args.users)
+    problems = {name: await create_problem(SCENARIOS[name]) for name in args.scenario}
+
+    reports = {}
+    if args.mode in ('direct', 'both'):
+        for name, problem_id in problems.items():
+            solutions = get_solutions(SCENARIOS[name], args.submissions)
+            started = time.perf_counter()
+            samples = await run_direct(problem_id, users, solutions, args.concurrency)
+            reports[f'direct/{name}'] = make_report(started, time.perf_counter(), samples)
+            print_report(f'direct/{name}', reports[f'direct/{name}'])
+        await fork_server.stop()
+
+    if args.mode in ('http', 'both'):
+        import uvicorn
+        from app.main import app
+
+        server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=args.port, log_level='warning'))
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            if serving.done():
+                serving.result()
+            await asyncio.sleep(0.05)
+        try:
+            for name, problem_id in problems.items():
+                # Другие комментарии - чтобы не получить вердикты из кэша прямого режима
+                solutions = [f'{solution}# http\n' for solution in get_solutions(SCENARIOS[name], args.submissions)]
+                started = time.perf_counter()
+                samples = await run_http(f'http://127.0.0.1:{args.port}', problem_id, users, solutions, args.concurrency)
+                reports[f'http/{name}'] = make_report(started, time.perf_counter(), samples)
+                print_report(f'http/{name}', reports[f'http/{name}'])
+        finally:
+            server.should_exit = True
+            await serving
+    return reports
+
+
+def print_report(key: str, report: Dict, baseline: Optional[Dict] = None) -> None:
+    overhead = report['overhead_per_test']
+    line = (
+        f'{key:<16} {report["submissions"]:>5} subs  {report["submissions_per_second"]:8.2f} subs/s  '
+        f'p50 {report["p50"] * 1000:8.1f} ms  p95 {report["p95"] * 1000:8.1f} ms  '
+        f'p99 {report["p99"] * 1000:8.1f} ms  '
+        f'overhead/test {overhead * 1000 if overhead is not None else float("nan"):7.2f} ms'
+    )
+    if baseline is not None:
+        line += (
+            f'  | subs/s {change(report["submissions_per_second"], baseline["submissions_per_second"])}'
+            f'  p95 {change(report["p95"], baseline["p95"])}'
+        )
+    print(line)
+    print(f'{"":<16} {report["verdicts"]}')
+
+
+def change(value: float, baseline: float) -> str:
+    if not baseline:
+        return 'n/a'
+    return f'{(value - baseline) / baseline * 100:+.1f}%'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Замеры судьи на синтетических задачах')
+    parser.add_argument('--mode', choices=('direct', 'http', 'both'), default='both')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS))
+    parser.add_argument('--submissions', type=int, default=20, help='посылок на каждую задачу')
+    parser.add_argument('--concurrency', type=int, default=4, help='посылок в работе одновременно')
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--work-dir', default=os.path.join('/tmp', 'judge-benchmark'))
+    parser.add_argument('--save', help='сохранить результаты в JSON')
+    parser.add_argument('--compare', help='сравнить с результатами, сохранёнными через --save')
+    args = parser.parse_args()
+    args.scenario = args.scenario or list(SCENARIOS)
+
+    # Настройки читаются при импорте core.config, поэтому импорты приложения - ниже
+    # Удаляем только то, что бенчмарк создаёт сам: --work-dir может быть и чужой папкой
+    os.makedirs(args.work_dir, exist_ok=True)
+    database_path = os.path.join(args.work_dir, 'judge.db')
+    test_store_dir = os.path.join(args.work_dir, 'benchmark_tests')
+    if os.path.exists(database_path):
+        os.remove(database_path)
+    shutil.rmtree(test_store_dir, ignore_errors=True)
+    os.environ['DATABASE_URL'] = f'sqlite+aiosqlite:///{database_path}'
+    os.environ['JUDGE_TEST_STORE_DIR'] = test_store_dir
+
+    reports = asyncio.run(benchmark(args))
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print('\nСравнение с', args.compare)
+        for key, report in reports.items():
+            if key in baseline:
+                print_report(key, report, baseline[key])
+    if args.save:
+        with open(args.save, 'w') as save_file:
+            json.dump(reports, save_file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Синтетические задачи для замеров судьи."""
+from typing import Callable, List, Tuple
+
+MEMORY_LIMIT = 256 * 1024 * 1024
+
+SUM_SOLUTION = 'print(sum(map(int, input().split())))'
+SQUARES_SOLUTION = '''n = int(input())
+total = 0
+for i in range(n):
+    total += i * i
+print(total)
+'''
+RANGE_SOLUTION = '''import sys
+sys.stdout.write('\\n'.join(map(str, range(int(input())))))
+'''
+WRONG_SOLUTION = 'print(0)'
+LOOP_SOLUTION = 'while True:\n    pass'
+
+
+class Scenario:
+
+    def __init__(
+            self,
+            name: str,
+            description: str,
+            tests: Callable[[], List[Tuple[bytes, bytes]]],
+            solutions: List[str],
+            time_limit: int = 1,
+    ):
+        self.name = name
+        self.description = description
+        self.tests = tests
+        # Посылки берут решения по кругу: доля каждого решения задаёт смесь вердиктов
+        self.solutions = solutions
+        self.time_limit = time_limit
+
+
+def tiny_tests() -> List[Tuple[bytes, bytes]]:
+    return [(f'{i} {i * 7}'.encode(), str(i * 8).encode()) for i in range(100)]
+
+
+def heavy_tests() -> List[Tuple[bytes, bytes]]:
+    tests = []
+    for n in (1_000_000, 1_500_000, 2_000_000):
+        tests.append((str(n).encode(), str((n - 1) * n * (2 * n - 1) // 6).encode()))
+    return tests
+
+
+def tle_tests() -> List[Tuple[bytes, bytes]]:
+    return [(f'{i} {i}'.encode(), str(2 * i).encode()) for i in range(3)]
+
+
+def output_tests() -> List[Tuple[bytes, bytes]]:
+    return [
+        (str(n).encode(), '\n'.join(map(str, range(n))).encode())
+        for n in (300_000, 600_000, 1_000_000)
+    ]
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario(
+            'tiny',
+            '100 мелких тестов: стоимость запуска решения и проверки',
+            tiny_tests,
+            [SUM_SOLUTION, SUM_SOLUTION, SUM_SOLUTION, WRONG_SOLUTION],
+        ),
+        Scenario(
+            'heavy',
+            '3 теста по 0.1-0.5 с процессорного времени',
+            heavy_tests,
+            [SQUARES_SOLUTION],
+            time_limit=2,
+        ),
+        Scenario(
+            'tle',
+            '3 теста, три посылки из четырёх превышают лимит времени',
+            tle_tests,
+            [LOOP_SOLUTION, LOOP_SOLUTION, LOOP_SOLUTION, SUM_SOLUTION],
+        ),
+        Scenario(
+            'output',
+            '3 теста с выводом до 7 МБ: чтение канала и потоковая проверка',
+            output_tests,
+            [RANGE_SOLUTION, RANGE_SOLUTION, RANGE_SOLUTION, WRONG_SOLUTION],
+        ),
+    )
+}
@@ -5,4 +5,5 @@ from models.user import *  # noqa
 from models.task import * # noqa
 from models.card import * # noqa
 from models.problem import * # noqa
+from models.category import * # noqa
 
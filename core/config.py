@@ -1,3 +1,4 @@
+import os
 from typing import Optional
 
 from pydantic import EmailStr
@@ -35,7 +36,25 @@ class Settings(BaseSettings):
     first_teacher_middle_name: Optional[str]
     first_teacher_class_id: Optional[str]
 
-
+    judge_mode: str = 'forkserver' if os.name == 'posix' else 'subprocess'
+    # Число слотов судьи и ядра для них, например '2-5,8' (см. judge/slots.py)
+    judge_max_processes: int = 4
+    judge_cpu_mask: Optional[str] = None
+    judge_tests_parallelism: int = 4
+    judge_wall_time_factor: float = 2.0
+    judge_work_dir: Optional[str] = None
+    judge_queue_workers: int = 4
+    judge_poll_interval: float = 1.0
+    # Промежуточные результаты тестов пишутся в базу не чаще раза в столько секунд
+    judge_progress_interval: float = 0.5
+    judge_stale_timeout: int = 600
+    judge_tests_cache_size: int = 64 * 1024 * 1024
+    judge_test_store_dir: Optional[str] = None
+    judge_output_limit: int = 64 * 1024 * 1024
+    judge_rejudge_concurrency: int = 2
+
+    # Как часто (в секундах) процесс сверяет версию закэшированных деревьев категорий
+    category_cache_ttl: float = 1.0
 
     model_config = SettingsConfigDict(env_file=".env")
 
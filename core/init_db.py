@@ -11,6 +11,7 @@ from db.session import get_async_session
 
 from app.schemes.user import UserCreate
 from models.card import CardCategory
+from models.category import CategoryVersion
 from models.class_ import Class
 from models.problem import ProblemCategory
 from models.task import TaskCategory, DifficultyLevel
@@ -48,6 +49,13 @@ async def create_base_db(
                 session.add(admin)
 
                 await session.commit()
+            # Версии деревьев категорий для их кэша (requests/category_cache.py)
+            trees = await session.scalars(select(CategoryVersion.tree))
+            seeded_trees = set(trees.all())
+            for model in (CardCategory, TaskCategory, ProblemCategory):
+                if model.__tablename__ not in seeded_trees:
+                    session.add(CategoryVersion(tree=model.__tablename__, version=0))
+            await session.commit()
     except UserAlreadyExists:
         pass
 
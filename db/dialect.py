@@ -0,0 +1,12 @@
+from typing import Callable, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def get_upsert_insert(session: AsyncSession) -> Optional[Callable]:
+    """insert с on_conflict_do_update для базы сессии; None, если база его не умеет."""
+    return {
+        'postgresql': postgresql.insert,
+        'sqlite': sqlite.insert,
+    }.get(session.bind.dialect.name)
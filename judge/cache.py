@@ -0,0 +1,107 @@
+"""Кэш наборов тестов в памяти процесса.
+
+Хранит лимиты задачи и пути к файлам её тестов под ключом
+(problem_id, tests_version). Версия задачи растёт при любом изменении тестов или лимитов, поэтому
+устаревший набор просто перестаёт совпадать. Обработчики тестов и задач
+дополнительно сбрасывают запись сразу, чтобы не держать её в памяти.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from core.config import settings
+from judge.test_store import test_store
+
+# Примерная цена объектов набора в памяти
+TEST_OVERHEAD = 200
+TEST_SET_OVERHEAD = 500
+
+
+class CachedProblem:
+
+    def __init__(self, problem):
+        self.id = problem.id
+        self.time_limit = problem.time_limit
+        self.memory_limit = problem.memory_limit
+        self.output_limit = problem.output_limit
+        self.checker = problem.checker
+        self.checker_tolerance = problem.checker_tolerance
+        self.stop_on_first_failure = problem.stop_on_first_failure
+        self.tests_version = problem.tests_version
+
+
+class CachedTest:
+    __slots__ = ('id', 'input_path', 'output_path')
+
+    def __init__(self, test):
+        self.id = test.id
+        self.input_path = test_store.path(test.input_hash)
+        self.output_path = test_store.path(test.output_hash)
+
+
+class TestSet:
+
+    def __init__(self, problem, tests):
+        self.problem = CachedProblem(problem)
+        self.tests: List[CachedTest] = [CachedTest(test) for test in tests]
+        self.size = TEST_SET_OVERHEAD + sum(
+            TEST_OVERHEAD + len(test.input_path) + len(test.output_path)
+            for test in self.tests
+        )
+
+
+class TestSetCache:
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.test_sets: OrderedDict[int, TestSet] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, problem_id: int, tests_version: int) -> Optional[TestSet]:
+        test_set = self.test_sets.get(problem_id)
+        if test_set is None or test_set.problem.tests_version != tests_version:
+            self.misses += 1
+            return None
+        self.test_sets.move_to_end(problem_id)
+        self.hits += 1
+        return test_set
+
+    def put(self, problem, tests) -> TestSet:
+        test_set = TestSet(problem, tests)
+        self.pop(problem.id)
+        if test_set.size > self.max_size:
+            # Набор больше всего бюджета - отдаём без кэширования
+            return test_set
+        self.test_sets[problem.id] = test_set
+        self.size += test_set.size
+        while self.size > self.max_size:
+            self.pop(next(iter(self.test_sets)))
+            self.evictions += 1
+        return test_set
+
+    def pop(self, problem_id: int) -> Optional[TestSet]:
+        test_set = self.test_sets.pop(problem_id, None)
+        if test_set is not None:
+            self.size -= test_set.size
+        return test_set
+
+    def invalidate(self, problem_id: int) -> None:
+        if self.pop(problem_id) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> Dict:
+        return {
+            'entries': len(self.test_sets),
+            'size': self.size,
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+test_set_cache = TestSetCache(settings.judge_tests_cache_size)
@@ -0,0 +1,231 @@
+"""Проверка вывода решения по частям.
+
+Ожидаемый ответ не читается в память целиком: файл отображается через mmap,
+а вывод решения сравнивается с ним кусками по мере чтения из канала. После
+первого расхождения чекер перестаёт сравнивать и только ждёт конца вывода.
+
+Режимы (Problem.checker):
+    exact  - побайтное совпадение без учёта пробелов в начале и конце
+    tokens - совпадение последовательностей слов, пробелы и переводы строк любые
+    float  - как tokens, но числа сравниваются с точностью checker_tolerance
+    lines  - совпадение множеств непустых строк, порядок строк не важен
+"""
+import hashlib
+import math
+import mmap
+import os
+import re
+from typing import Optional
+
+WHITESPACE = b' \t\n\r\x0b\x0c'
+TOKEN = re.compile(rb'\S+')
+LINE = re.compile(rb'[^\n]+')
+
+CHECKER_EXACT = 'exact'
+CHECKER_TOKENS = 'tokens'
+CHECKER_FLOAT = 'float'
+CHECKER_LINES = 'lines'
+
+DEFAULT_TOLERANCE = 1e-6
+# Число может быть записано длиннее ожидаемого (1.000000 вместо 1)
+MAX_NUMBER_SIZE = 64
+
+
+class Checker:
+
+    def __init__(self, expected_path: str):
+        with open(expected_path, 'rb') as expected_file:
+            if os.fstat(expected_file.fileno()).st_size:
+                self.expected = mmap.mmap(expected_file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                # Пустой файл в mmap не отобразить
+                self.expected = b''
+        self.accepted = True
+        # Время, потраченное на проверку (считает судья, для метрик)
+        self.elapsed = 0.0
+
+    def feed(self, chunk: bytes) -> None:
+        raise NotImplementedError
+
+    def finish(self) -> bool:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        if isinstance(self.expected, mmap.mmap):
+            self.expected.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ExactChecker(Checker):
+
+    def __init__(self, expected_path: str):
+        super().__init__(expected_path)
+        self.start = 0
+        self.end = len(self.expected)
+        while self.start < self.end and self.expected[self.start] in WHITESPACE:
+            self.start += 1
+        while self.end > self.start and self.expected[self.end - 1] in WHITESPACE:
+            self.end -= 1
+        self.position = self.start
+        self.started = False
+
+    def feed(self, chunk: bytes) -> None:
+        if not self.accepted:
+            return
+        if not self.started:
+            chunk = chunk.lstrip(WHITESPACE)
+            if not chunk:
+                return
+            self.started = True
+        # Сравниваем с ещё не совпавшей частью ответа
+        length = min(len(chunk), self.end - self.position)
+        if chunk[:length] != self.expected[self.position:self.position + length]:
+            self.accepted = False
+            return
+        self.position += length
+        # После конца ответа допустимы только пробельные символы
+        if chunk[length:].strip(WHITESPACE):
+            self.accepted = False
+
+    def finish(self) -> bool:
+        return self.accepted and self.position == self.end
+
+
+class TokenChecker(Checker):
+
+    def __init__(self, expected_path: str):
+        super().__init__(expected_path)
+        self.expected_tokens = TOKEN.finditer(self.expected)
+        self.expected_token = self.next_expected()
+        # Слово, оборванное на границе куска вывода
+        self.pending = b''
+
+    def next_expected(self) -> Optional[bytes]:
+        match = next(self.expected_tokens, None)
+        return match.group() if match is not None else None
+
+    def compare(self, token: bytes, expected: bytes) -> bool:
+        return token == expected
+
+    def max_token_size(self, expected: bytes) -> int:
+        return len(expected)
+
+    def check_token(self, token: bytes) -> bool:
+        if self.expected_token is None or not self.compare(token, self.expected_token):
+            return False
+        self.expected_token = self.next_expected()
+        return True
+
+    def feed(self, chunk: bytes) -> None:
+        if not self.accepted:
+            return
+        data = self.pending + chunk
+        tokens = data.split()
+        self.pending = tokens.pop() if tokens and not data[-1:].isspace() else b''
+        for token in tokens:
+            if not self.check_token(token):
+                self.accepted = False
+                return
+        # Слишком длинное слово уже не совпадёт - не копим его дальше
+        if self.pending and (
+            self.expected_token is None
+            or len(self.pending) > self.max_token_size(self.expected_token)
+        ):
+            self.accepted = False
+
+    def close(self) -> None:
+        # Итератор держит ссылку на буфер mmap, с ней mmap не закрыть
+        self.expected_tokens = None
+        super().close()
+
+    def finish(self) -> bool:
+        if self.accepted and self.pending:
+            self.accepted = self.check_token(self.pending)
+            self.pending = b''
+        return self.accepted and self.expected_token is None
+
+
+class FloatChecker(TokenChecker):
+
+    def __init__(self, expected_path: str, tolerance: float = DEFAULT_TOLERANCE):
+        super().__init__(expected_path)
+        self.tolerance = tolerance
+
+    def compare(self, token: bytes, expected: bytes) -> bool:
+        if token == expected:
+            return True
+        try:
+            value = float(token)
+            expected_value = float(expected)
+        except ValueError:
+            return False
+        if not math.isfinite(value) or not math.isfinite(expected_value):
+            return False
+        # Абсолютная погрешность для малых чисел, относительная - для больших
+        return abs(value - expected_value) <= self.tolerance * max(1.0, abs(expected_value))
+
+    def max_token_size(self, expected: bytes) -> int:
+        return max(len(expected), MAX_NUMBER_SIZE)
+
+
+class LineSetChecker(Checker):
+    """Множества строк сравниваются по сумме хэшей строк и их числу:
+    сумма не зависит от порядка, а хранить сами строки не нужно."""
+
+    def __init__(self, expected_path: str):
+        super().__init__(expected_path)
+        self.expected_hash, self.expected_count = 0, 0
+        for match in LINE.finditer(self.expected):
+            line = match.group().strip(WHITESPACE)
+            if line:
+                self.expected_hash = (self.expected_hash + self.hash_line(line)) % 2 ** 64
+                self.expected_count += 1
+        self.output_hash, self.output_count = 0, 0
+        self.pending = b''
+
+    @staticmethod
+    def hash_line(line: bytes) -> int:
+        return int.from_bytes(hashlib.blake2b(line, digest_size=8).digest(), 'little')
+
+    def add_line(self, line: bytes) -> None:
+        line = line.strip(WHITESPACE)
+        if line:
+            self.output_hash = (self.output_hash + self.hash_line(line)) % 2 ** 64
+            self.output_count += 1
+
+    def feed(self, chunk: bytes) -> None:
+        if not self.accepted:
+            return
+        lines = (self.pending + chunk).split(b'\n')
+        self.pending = lines.pop()
+        for line in lines:
+            self.add_line(line)
+        # Строка длиннее всего ответа не может в нём встретиться
+        if self.output_count > self.expected_count or len(self.pending) > len(self.expected):
+            self.accepted = False
+
+    def finish(self) -> bool:
+        if self.accepted:
+            self.add_line(self.pending)
+            self.pending = b''
+        return (
+            self.accepted
+            and self.output_count == self.expected_count
+            and self.output_hash == self.expected_hash
+        )
+
+
+def create_checker(problem, expected_path: str) -> Checker:
+    checker = problem.checker or CHECKER_EXACT
+    if checker == CHECKER_TOKENS:
+        return TokenChecker(expected_path)
+    if checker == CHECKER_FLOAT:
+        return FloatChecker(expected_path, problem.checker_tolerance or DEFAULT_TOLERANCE)
+    if checker == CHECKER_LINES:
+        return LineSetChecker(expected_path)
+    return ExactChecker(expected_path)
@@ -0,0 +1,384 @@
+"""Прогретый интерпретатор для запуска решений.
+
+Сервер запускается один раз на процесс API или воркера (python -m judge.forkserver)
+и на каждый тест делает fork. Дочерний процесс получает stdin/stdout/stderr через
+unix-сокет (SCM_RIGHTS) и выполняет заранее скомпилированный код решения, так что
+запуск интерпретатора и импорт стандартных модулей не входят во время теста.
+"""
+import asyncio
+import builtins
+import json
+import marshal
+import math
+import os
+import selectors
+import signal
+import socket
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:
+    # Windows: форк-сервер недоступен, судья работает в режиме subprocess
+    resource = None
+
+# Модули, которые чаще всего импортируют решения, загружаем заранее
+PRELOADED_MODULES = (
+    'bisect', 'collections', 'decimal', 'fractions', 'functools', 'heapq',
+    'itertools', 'math', 're', 'string', 'random', 'statistics',
+)
+
+CODE_CACHE_SIZE = 64
+MESSAGE_SIZE = 65536
+# Заголовок .pyc: magic, флаги и сведения об исходнике
+PYC_HEADER_SIZE = 16
+# Код выхода ребёнка, которому не хватило памяти под RLIMIT_AS
+MEMORY_ERROR_EXIT_CODE = 211
+# ru_maxrss в Linux измеряется в килобайтах, в macOS - в байтах
+MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+class ChildProcess:
+
+    def __init__(self, request_id: int, wall_time_limit: float):
+        self.request_id = request_id
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + wall_time_limit
+        self.killed: Optional[str] = None
+
+
+class CodeCache:
+
+    def __init__(self):
+        self.codes = OrderedDict()
+
+    def get(self, path: str):
+        try:
+            stat = os.stat(path)
+        except OSError as error:
+            # Рабочую папку уже убрали (посылку отменили) - падает только ребёнок
+            return error
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key in self.codes:
+            self.codes.move_to_end(key)
+            return self.codes[key]
+        try:
+            with open(path, 'rb') as code_file:
+                if path.endswith('.pyc'):
+                    code = marshal.loads(code_file.read()[PYC_HEADER_SIZE:])
+                else:
+                    code = compile(code_file.read(), path, 'exec')
+        except (SyntaxError, ValueError) as error:
+            # Ошибку компиляции покажет дочерний процесс, как это сделал бы python
+            code = error
+        self.codes[key] = code
+        if len(self.codes) > CODE_CACHE_SIZE:
+            self.codes.popitem(last=False)
+        return code
+
+
+def get_address_space() -> int:
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[0]) * resource.getpagesize()
+
+
+def measure_baseline_memory() -> int:
+    # ru_maxrss ребёнка, который сразу завершился: столько памяти любой ребёнок
+    # получает в наследство от форк-сервера, и к решению она не относится
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0)
+    _, _, rusage = os.wait4(pid, 0)
+    return rusage.ru_maxrss * MAXRSS_UNIT
+
+
+def apply_limits(time_limit: float, memory_limit: Optional[int]) -> None:
+    # Процессорное время: на мягком пределе ядро шлёт SIGXCPU, на жёстком - SIGKILL
+    cpu_limit = math.ceil(time_limit) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+    # Решению нельзя запускать процессы и потоки: RLIMIT_NPROC считается на
+    # пользователя ОС, и при нуле любой fork отказывает (для root не действует)
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    if memory_limit:
+        # Лимит памяти задачи отсчитываем от того, что уже занял интерпретатор
+        try:
+            address_space = get_address_space()
+        except OSError:
+            return
+        limit = address_space + memory_limit
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def run_child(
+        code,
+        path: str,
+        fds: List[int],
+        time_limit: float,
+        memory_limit: Optional[int],
+        cpu: Optional[int] = None,
+) -> None:
+    exit_code = 0
+    try:
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+        os.closerange(3, os.sysconf('SC_OPEN_MAX'))
+        os.setpgid(0, 0)
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        sys.stdin = open(0, 'r', closefd=False)
+        sys.stdout = open(1, 'w', closefd=False)
+        sys.stderr = open(2, 'w', closefd=False)
+        sys.argv = [path]
+        sys.path[0] = os.path.dirname(path)
+        if cpu is not None:
+            # Ядро слота судьи (JUDGE_CPU_MASK)
+            os.sched_setaffinity(0, {cpu})
+        apply_limits(time_limit, memory_limit)
+        if isinstance(code, BaseException):
+            raise code
+        exec(code, {'__name__': '__main__', '__file__': path, '__builtins__': builtins})
+    except MemoryError:
+        exit_code = MEMORY_ERROR_EXIT_CODE
+    except SystemExit as error:
+        if error.code is None:
+            exit_code = 0
+        elif isinstance(error.code, int):
+            exit_code = error.code
+        else:
+            print(error.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            exit_code = exit_code or 1
+        os._exit(exit_code)
+
+
+def serve(sock: socket.socket) -> None:
+    for module in PRELOADED_MODULES:
+        __import__(module)
+    code_cache = CodeCache()
+    children: Dict[int, ChildProcess] = {}
+    baseline_memory = measure_baseline_memory()
+
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_read, False)
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    selector = selectors.DefaultSelector()
+    selector.register(sock, selectors.EVENT_READ)
+    selector.register(wakeup_read, selectors.EVENT_READ)
+
+    def kill(pid: int, reason: str) -> None:
+        children[pid].killed = reason
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def reap() -> None:
+        while children:
+            try:
+                pid, status, rusage = os.wait4(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            child = children.pop(pid, None)
+            if child is None:
+                continue
+            # После смерти решения в его группе могут остаться потомки, держащие
+            # stdout открытым: без этого судья читал бы вывод без ограничения по времени
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            try:
+                sock.send(json.dumps({
+                    'id': child.request_id,
+                    'returncode': os.waitstatus_to_exitcode(status),
+                    'started_at': child.started_at,
+                    'wall_time': time.monotonic() - child.started_at,
+                    'cpu_time': rusage.ru_utime + rusage.ru_stime,
+                    'memory': max(rusage.ru_maxrss * MAXRSS_UNIT - baseline_memory, 0),
+                    'killed': child.killed,
+                }).encode())
+            except (BrokenPipeError, ConnectionResetError):
+                # Клиент ушёл; остальных детей уберёт обработка пустого сообщения
+                pass
+
+    while True:
+        timeout = None
+        if children:
+            timeout = max(min(child.deadline for child in children.values()) - time.monotonic(), 0)
+        for key, _ in selector.select(timeout):
+            if key.fileobj == wakeup_read:
+                try:
+                    while os.read(wakeup_read, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+            message, fds, _, _ = socket.recv_fds(sock, MESSAGE_SIZE, 3)
+            if not message:
+                # Клиент ушёл - убираем всех детей и выходим
+                for pid in list(children):
+                    kill(pid, 'shutdown')
+                return
+            request = json.loads(message)
+            if request['op'] == 'run':
+                code = code_cache.get(request['path'])
+                pid = os.fork()
+                if pid == 0:
+                    selector.close()
+                    sock.close()
+                    run_child(
+                        code,
+                        request['path'],
+                        fds,
+                        request['time_limit'],
+                        request['memory_limit'],
+                        request.get('cpu'),
+                    )
+                try:
+                    # Дублируем setpgid из ребёнка, чтобы killpg не опередил его
+                    os.setpgid(pid, pid)
+                except OSError:
+                    pass
+                for fd in fds:
+                    os.close(fd)
+                children[pid] = ChildProcess(request['id'], request['wall_time_limit'])
+            elif request['op'] == 'kill':
+                for pid, child in list(children.items()):
+                    if child.request_id == request['id']:
+                        kill(pid, 'cancelled')
+        reap()
+        now = time.monotonic()
+        for pid, child in list(children.items()):
+            if child.killed is None and child.deadline <= now:
+                kill(pid, 'timeout')
+
+
+class ForkServer:
+
+    def __init__(self):
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.sock: Optional[socket.socket] = None
+        self.waiters: Dict[int, asyncio.Future] = {}
+        self.next_id = 0
+        self.lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self.lock:
+            if self.sock is not None:
+                return
+            parent_sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            self.process = await asyncio.create_subprocess_exec(
+                sys.executable, '-m', 'judge.forkserver', str(child_sock.fileno()),
+                pass_fds=[child_sock.fileno()],
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            )
+            child_sock.close()
+            parent_sock.setblocking(False)
+            asyncio.get_running_loop().add_reader(parent_sock.fileno(), self.on_message)
+            self.sock = parent_sock
+
+    async def stop(self) -> None:
+        if self.sock is None:
+            return
+        self.close(RuntimeError('Fork server stopped'))
+        await self.process.wait()
+
+    def close(self, error: Exception) -> None:
+        asyncio.get_running_loop().remove_reader(self.sock.fileno())
+        self.sock.close()
+        self.sock = None
+        for waiter in self.waiters.values():
+            if not waiter.done():
+                waiter.set_exception(error)
+        self.waiters.clear()
+
+    def on_message(self) -> None:
+        while self.sock is not None:
+            try:
+                message = self.sock.recv(MESSAGE_SIZE)
+            except BlockingIOError:
+                return
+            if not message:
+                self.close(RuntimeError('Fork server exited'))
+                return
+            reply = json.loads(message)
+            waiter = self.waiters.pop(reply['id'], None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(reply)
+
+    def send(self, request: Dict, fds: List[int] = ()) -> None:
+        socket.send_fds(self.sock, [json.dumps(request).encode()], list(fds))
+
+    async def run(
+            self,
+            path: str,
+            fds: List[int],
+            time_limit: float,
+            memory_limit: Optional[int],
+            wall_time_limit: float,
+            cpu: Optional[int] = None,
+            stop: Optional[asyncio.Event] = None,
+    ) -> Dict:
+        """Запускает path с stdin/stdout/stderr = fds и ждёт завершения.
+
+        Дескрипторы fds передаются дочернему процессу и закрываются здесь.
+        stop убивает решение досрочно, но, в отличие от отмены, ответ с
+        ресурсами процесса всё равно возвращается.
+        """
+        try:
+            await self.start()
+            self.next_id += 1
+            request_id = self.next_id
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters[request_id] = waiter
+            self.send({
+                'op': 'run',
+                'id': request_id,
+                'path': path,
+                'time_limit': time_limit,
+                'memory_limit': memory_limit,
+                'wall_time_limit': wall_time_limit,
+                'cpu': cpu,
+            }, fds)
+        finally:
+            for fd in fds:
+                os.close(fd)
+        try:
+            if stop is not None:
+                stopped = asyncio.ensure_future(stop.wait())
+                try:
+                    await asyncio.wait([waiter, stopped], return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    stopped.cancel()
+                if not waiter.done():
+                    self.send({'op': 'kill', 'id': request_id})
+            return await waiter
+        except asyncio.CancelledError:
+            self.waiters.pop(request_id, None)
+            if self.sock is not None:
+                self.send({'op': 'kill', 'id': request_id})
+            raise
+
+
+fork_server = ForkServer()
+
+
+if __name__ == '__main__':
+    serve(socket.socket(fileno=int(sys.argv[1])))
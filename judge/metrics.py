@@ -0,0 +1,211 @@
+"""Метрики работы судьи в этом процессе.
+
+Отдаются в текстовом формате Prometheus через GET /metrics. Каждый процесс
+(API и python -m judge.worker) считает только свои посылки.
+
+Этапы проверки посылки (judge_stage_seconds, метка stage):
+    queue_wait   - от отправки до того, как воркер взял посылку
+    test_fetch   - лимиты и тесты задачи (кэш или база)
+    source_write - запись исходника и компиляция в байт-код
+    spawn        - от запроса на запуск до старта процесса решения
+    run          - выполнение решения до его завершения, по часам
+    compare      - проверка вывода чекером (идёт во время run, по мере чтения)
+    persist      - запись вердикта и результатов тестов в базу
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def escape_help(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        registry.append(self)
+
+    def key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> Iterator[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f'# HELP {self.name} {escape_help(self.description)}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        for name, label_names, label_values, value in self.samples():
+            lines.append(f'{name}{format_labels(label_names, label_values)} {format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self.values: Dict[Tuple[str, ...], float] = {} if labels else {(): 0.0}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, self.labels, key, value
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[self.key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(
+            self,
+            name: str,
+            description: str,
+            labels: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # Для каждого набора меток: число значений в каждой корзине (не накопительно),
+        # сумма и общее число значений
+        self.values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self.key(labels)
+        if key not in self.values:
+            self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+        entry = self.values[key]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][index] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        for key, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', self.labels + ('le',), key + (format_value(bound),), cumulative
+            yield f'{self.name}_sum', self.labels, key, total
+            yield f'{self.name}_count', self.labels, key, count
+
+
+registry: List[Metric] = []
+
+
+def collect() -> Dict[str, float]:
+    # Плоский вид для /judge/metrics: у гистограмм - только сумма и число
+    values = {}
+    for metric in registry:
+        for name, label_names, label_values, value in metric.samples():
+            if not name.endswith('_bucket'):
+                values[f'{name}{format_labels(label_names, label_values)}'] = value
+    return values
+
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+tests_skipped = Counter(
+    'judge_tests_skipped_total',
+    'Тесты, не запущенные после первой ошибки (stop_on_first_failure)',
+)
+skipped_time_saved = Counter(
+    'judge_skipped_time_saved_seconds_total',
+    'Оценка сэкономленного времени: пропущенные тесты x среднее время выполненных',
+)
+stage_seconds = Histogram(
+    'judge_stage_seconds',
+    'Длительность этапов проверки посылки',
+    labels=('stage',),
+)
+queue_wait_seconds = Histogram(
+    'judge_queue_wait_seconds',
+    'Ожидание в очереди от отправки до начала проверки, по полосам',
+    labels=('lane',),
+)
+test_verdicts = Counter(
+    'judge_test_verdicts_total',
+    'Вердикты тестов',
+    labels=('verdict',),
+)
+submission_verdicts = Counter(
+    'judge_submission_verdicts_total',
+    'Вердикты посылок, проверенных воркерами',
+    labels=('verdict',),
+)
+kills = Counter(
+    'judge_kills_total',
+    'Решения, остановленные судьёй или ядром, по причинам',
+    labels=('reason',),
+)
+slots_busy = Gauge(
+    'judge_slots_busy',
+    'Занятые слоты судьи (запущенные решения)',
+)
+slots_total = Gauge(
+    'judge_slots_total',
+    'Всего слотов судьи',
+)
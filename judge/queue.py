@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemes.problem import UserProblemCreate
+from judge.service import reuse_results
+from models.problem import Problem, Rejudge, Submission
+from requests.problem import problem_requests, rejudge_requests, submission_requests
+from requests.user import user_requests
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# Полосы очереди: воркер берёт посылку из полосы с наибольшим приоритетом,
+# а внутри полосы чередует пользователей по кругам (Submission.fair_round)
+PRIORITY_TEACHER = 2
+PRIORITY_STUDENT = 1
+PRIORITY_REJUDGE = 0
+LANES = {
+    PRIORITY_TEACHER: 'teacher',
+    PRIORITY_STUDENT: 'student',
+    PRIORITY_REJUDGE: 'rejudge',
+}
+TEACHER_LEVEL = 2
+
+# Будит воркеров этого процесса, чтобы они не ждали следующего опроса таблицы
+submission_added = asyncio.Event()
+
+
+async def enqueue(
+        user_problem_create: UserProblemCreate,
+        session: AsyncSession,
+) -> Submission:
+    submission = Submission(
+        user_id=user_problem_create.user_id,
+        problem_id=user_problem_create.problem_id,
+        solution=user_problem_create.solution,
+        status=STATUS_QUEUED,
+    )
+    problem = await problem_requests.get(id=user_problem_create.problem_id, session=session)
+    reused = await reuse_results(user_problem_create, problem, session=session)
+    if reused is None:
+        level = await user_requests.get_level(user_problem_create.user_id, session=session)
+        submission.priority = PRIORITY_TEACHER if level >= TEACHER_LEVEL else PRIORITY_STUDENT
+        submission.fair_round = await submission_requests.next_fair_round(
+            submission.user_id, submission.priority, session=session
+        )
+    else:
+        # Повторная отправка того же кода - посылка сразу готова, воркер не нужен
+        db_user_problem, tests_count = reused
+        submission.status = STATUS_DONE
+        submission.started_at = submission.finished_at = datetime.now()
+        submission.tests_total = submission.tests_done = tests_count
+        submission.verdict = db_user_problem.verdict
+        submission.user_problem_id = db_user_problem.id
+    session.add(submission)
+    await session.commit()
+    await session.refresh(submission)
+    if reused is None:
+        submission_added.set()
+    return submission
+
+
+async def get_queue_stats(session: AsyncSession) -> List[Dict]:
+    lanes = {
+        priority: {
+            'lane': lane,
+            'priority': priority,
+            'queued': 0,
+            'running': 0,
+            'users': 0,
+            'oldest_wait': 0.0,
+        }
+        for priority, lane in LANES.items()
+    }
+    now = datetime.now()
+    for priority, status, count, users, oldest in await submission_requests.get_queue_stats(session=session):
+        lane = lanes.get(priority)
+        if lane is None:
+            continue
+        lane[status] = count
+        if status == STATUS_QUEUED:
+            lane['users'] = users
+            lane['oldest_wait'] = (now - oldest).total_seconds()
+    return list(lanes.values())
+
+
+async def enqueue_rejudge(problem: Problem, session: AsyncSession) -> Rejudge:
+    rejudge = await rejudge_requests.create_for_problem(problem, PRIORITY_REJUDGE, session=session)
+    if rejudge.total:
+        submission_added.set()
+    return rejudge
+
+
+async def get_rejudge_progress(rejudge: Rejudge, session: AsyncSession) -> Dict:
+    progress = await rejudge_requests.get_progress(rejudge.id, session=session)
+    return {
+        'id': rejudge.id,
+        'problem_id': rejudge.problem_id,
+        'created_at': rejudge.created_at,
+        'tests_version': rejudge.tests_version,
+        'total': rejudge.total,
+        'queued': progress.get(STATUS_QUEUED, 0),
+        'running': progress.get(STATUS_RUNNING, 0),
+        'done': progress.get(STATUS_DONE, 0),
+        'failed': progress.get(STATUS_FAILED, 0),
+        'changed': rejudge.changed,
+    }
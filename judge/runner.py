@@ -0,0 +1,507 @@
+import asyncio
+import math
+import os
+import signal
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import psutil
+
+from core.config import settings
+from judge import metrics
+from judge.checker import Checker, create_checker
+from judge.forkserver import MEMORY_ERROR_EXIT_CODE, fork_server, resource
+from judge.slots import pin_to_cpu, slot_pool
+from judge.workdir import WorkDir
+
+VERDICT_OK = 'OK'
+VERDICT_WRONG_ANSWER = 'Неверный ответ'
+VERDICT_TIME_LIMIT = 'Превышен лимит времени'
+VERDICT_MEMORY_LIMIT = 'Превышен лимит памяти'
+VERDICT_COMPILATION_ERROR = 'Ошибка компилятора'
+VERDICT_OUTPUT_LIMIT = 'Превышен лимит вывода'
+VERDICT_SKIPPED = 'Пропущен'
+
+NO_OUTPUT = 'Ответ отсутствует'
+
+MEMORY_SAMPLE_INTERVAL = 0.01
+READ_CHUNK_SIZE = 65536
+# Сохраняется только начало вывода: столбец user_output - String(16000)
+USER_OUTPUT_LIMIT = 16000
+STDERR_LIMIT = 65536
+# Адресное пространство самого интерпретатора в режиме subprocess сверх лимита задачи,
+# если замерить его не удалось (см. InterpreterMemory)
+INTERPRETER_ADDRESS_SPACE = 64 * 1024 * 1024
+# Как часто проверять, завершился ли процесс решения
+EXIT_POLL_INTERVAL = 0.01
+# Сколько ждать закрытия каналов после SIGKILL группы
+KILL_DRAIN_TIMEOUT = 1.0
+# Пустой интерпретатор: сообщает, что запустился, и ждёт закрытия stdin
+INTERPRETER_MEMORY_PROBE = 'import sys; print(flush=True); sys.stdin.read()'
+
+
+
+def make_result(verdict: str, test_id: int, time: float = 0, memory: float = 0, user_output: str = NO_OUTPUT) -> Dict:
+    return {
+        'verdict': verdict,
+        'time': time,
+        'memory': memory,
+        'test_id': test_id,
+        'user_output': user_output
+    }
+
+
+class Execution:
+
+    def __init__(
+            self,
+            stdout: bytes,
+            stderr: bytes,
+            time: float,
+            memory: int = 0,
+            timed_out: bool = False,
+            memory_exceeded: bool = False,
+            output_exceeded: bool = False,
+            kill_reason: Optional[str] = None,
+    ):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.time = time
+        self.memory = memory
+        self.timed_out = timed_out
+        self.memory_exceeded = memory_exceeded
+        self.output_exceeded = output_exceeded
+        # Почему решение остановили до его завершения (для метрик)
+        self.kill_reason = kill_reason
+
+
+class OutputLimitExceeded(Exception):
+
+    def __init__(self, output: bytes):
+        super().__init__()
+        self.output = output
+
+
+class InterpreterMemory:
+    """Память, которую занимает сам интерпретатор в режиме subprocess.
+
+    Резидентную память вычитаем из замеров psutil, а адресное пространство
+    добавляем к RLIMIT_AS: лимит и отчёт о памяти решения отсчитываются от
+    той же точки, что и в форк-сервере. Замеряется один раз на процесс.
+    """
+
+    def __init__(self):
+        self.measured = False
+        self.resident = 0
+        self.address_space = INTERPRETER_ADDRESS_SPACE
+
+    async def measure(self) -> None:
+        if self.measured:
+            return
+        # Меряем так же, как решение: psutil снаружи процесса
+        probe = await asyncio.create_subprocess_exec(
+            sys.executable, '-c', INTERPRETER_MEMORY_PROBE,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        try:
+            await probe.stdout.readline()
+            memory_info = psutil.Process(probe.pid).memory_info()
+            self.resident = memory_info.rss
+            self.address_space = memory_info.vms
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+        finally:
+            probe.stdin.close()
+            await probe.wait()
+        self.measured = True
+
+
+interpreter_memory = InterpreterMemory()
+
+
+def get_output_limit(problem) -> int:
+    return problem.output_limit or settings.judge_output_limit
+
+
+def get_wall_time_limit(time_limit: float) -> float:
+    # Ожидание ввода и сон не тратят процессорное время, поэтому есть и предел по часам
+    return time_limit * settings.judge_wall_time_factor
+
+
+def prepare_child(
+        time_limit: float,
+        memory_limit: Optional[int] = None,
+        cpu: Optional[int] = None,
+) -> Optional[Callable[[], None]]:
+    if resource is None:
+        return None
+    cpu_limit = math.ceil(time_limit) + 1
+
+    def preexec() -> None:
+        pin_to_cpu(cpu)
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+        # Как и в форк-сервере: решение не может запускать процессы
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+        if memory_limit:
+            # Память сверх лимита ядро не выдаст: решение получит MemoryError
+            address_space = memory_limit + interpreter_memory.address_space
+            resource.setrlimit(resource.RLIMIT_AS, (address_space, address_space))
+
+    return preexec
+
+
+def kill_group(process: asyncio.subprocess.Process) -> None:
+    # Решение - лидер своей сессии: убиваем и его, и оставшихся потомков
+    try:
+        if resource is None:
+            if process.returncode is None:
+                process.kill()
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def wait_exit(process: asyncio.subprocess.Process) -> None:
+    # wait() ждёт ещё и закрытия каналов, которые могут держать потомки решения,
+    # поэтому следим за кодом возврата и после выхода добиваем группу
+    while process.returncode is None:
+        await asyncio.sleep(EXIT_POLL_INTERVAL)
+    kill_group(process)
+
+
+async def kill_process(process: asyncio.subprocess.Process, readers: List[asyncio.Future] = ()) -> None:
+    for reader in readers:
+        reader.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+    kill_group(process)
+
+    async def drain() -> None:
+        # Остатки каналов дочитываем без сохранения: пока они открыты, wait() не завершится
+        await asyncio.gather(*(
+            read_output(stream, 0)
+            for stream in (process.stdout, process.stderr)
+            if stream is not None
+        ))
+        await process.wait()
+
+    try:
+        await asyncio.wait_for(drain(), timeout=KILL_DRAIN_TIMEOUT)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def sample_peak_memory(pid: int, baseline_memory: int = 0) -> int:
+    # Пиковая память дочернего процесса, пока он жив, за вычетом памяти интерпретатора
+    peak = 0
+    try:
+        child = psutil.Process(pid)
+        while True:
+            peak = max(peak, child.memory_info().rss)
+            await asyncio.sleep(MEMORY_SAMPLE_INTERVAL)
+    except (psutil.NoSuchProcess, psutil.AccessDenied, asyncio.CancelledError):
+        return max(peak - baseline_memory, 0)
+
+
+async def read_output(
+        reader: asyncio.StreamReader,
+        limit: int,
+        checker: Optional[Checker] = None,
+        max_size: Optional[int] = None,
+) -> bytes:
+    # Читаем канал до конца, но храним только первые limit байт
+    prefix = bytearray()
+    size = 0
+    while chunk := await reader.read(READ_CHUNK_SIZE):
+        size += len(chunk)
+        if len(prefix) < limit:
+            prefix += chunk[:limit - len(prefix)]
+        if max_size is not None and size > max_size:
+            raise OutputLimitExceeded(bytes(prefix))
+        if checker is not None:
+            started = time.perf_counter()
+            checker.feed(chunk)
+            checker.elapsed += time.perf_counter() - started
+    return bytes(prefix)
+
+
+async def execute_subprocess(code_path: str, test, problem, checker: Checker, cpu: Optional[int] = None) -> Execution:
+    """Запуск отдельного интерпретатора: время - по часам, память ограничена
+    RLIMIT_AS, а пик берётся из замеров psutil."""
+    await interpreter_memory.measure()
+    start_time = time.time()
+    with open(test.input_path, 'rb') as stdin:
+        child = await asyncio.create_subprocess_exec(
+            # .pyc в рабочей папке собран этим же интерпретатором: другая версия
+            # python из PATH не прочитала бы его (Bad magic number)
+            sys.executable, code_path,
+            stdin=stdin,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            preexec_fn=prepare_child(problem.time_limit, problem.memory_limit, cpu),
+            start_new_session=True,
+        )
+    spawned_time = time.time()
+    metrics.stage_seconds.observe(spawned_time - start_time, stage='spawn')
+    memory_sampler = asyncio.create_task(sample_peak_memory(child.pid, interpreter_memory.resident))
+    readers = [
+        asyncio.ensure_future(read_output(child.stdout, USER_OUTPUT_LIMIT, checker, get_output_limit(problem))),
+        asyncio.ensure_future(read_output(child.stderr, STDERR_LIMIT)),
+    ]
+    try:
+        stdout, stderr, _ = await asyncio.wait_for(
+            asyncio.gather(*readers, wait_exit(child)),
+            timeout=get_wall_time_limit(problem.time_limit)
+        )
+    except OutputLimitExceeded as error:
+        # Решение убиваем, не дожидаясь лимита времени
+        await kill_process(child, readers)
+        memory_sampler.cancel()
+        metrics.stage_seconds.observe(time.time() - spawned_time, stage='run')
+        return Execution(
+            error.output, b'', time.time() - start_time, await memory_sampler,
+            output_exceeded=True, kill_reason='output_limit',
+        )
+    except asyncio.TimeoutError:
+        await kill_process(child, readers)
+        memory_sampler.cancel()
+        metrics.stage_seconds.observe(time.time() - spawned_time, stage='run')
+        return Execution(
+            b'', b'', time.time() - start_time, await memory_sampler,
+            timed_out=True, kill_reason='wall_time',
+        )
+    except asyncio.CancelledError:
+        await kill_process(child, readers)
+        memory_sampler.cancel()
+        metrics.kills.inc(reason='cancelled')
+        raise
+    execution_time = time.time() - start_time
+    metrics.stage_seconds.observe(time.time() - spawned_time, stage='run')
+    memory_sampler.cancel()
+    memory = await memory_sampler
+    timed_out = child.returncode in (-signal.SIGXCPU, -signal.SIGKILL) if resource else False
+    return Execution(
+        stdout,
+        stderr,
+        execution_time,
+        memory,
+        timed_out=timed_out,
+        memory_exceeded=child.returncode == 1 and is_memory_error(stderr),
+        kill_reason='cpu_time' if timed_out else None,
+    )
+
+
+def is_memory_error(stderr: bytes) -> bool:
+    # Интерпретатор завершился необработанным MemoryError (упёрся в RLIMIT_AS)
+    lines = stderr.rstrip().splitlines()
+    return bool(lines) and lines[-1].startswith(b'MemoryError')
+
+
+async def read_pipe(
+        fd: int,
+        limit: int,
+        checker: Optional[Checker] = None,
+        max_size: Optional[int] = None,
+) -> bytes:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader),
+        open(fd, 'rb', buffering=0)
+    )
+    try:
+        return await read_output(reader, limit, checker, max_size)
+    finally:
+        transport.close()
+
+
+def observe_forkserver_stages(reply: Dict, start_time: float) -> None:
+    # Часы форк-сервера и судьи общие (CLOCK_MONOTONIC), started_at - момент fork
+    metrics.stage_seconds.observe(max(reply['started_at'] - start_time, 0), stage='spawn')
+    metrics.stage_seconds.observe(reply['wall_time'], stage='run')
+
+
+async def execute_forkserver(code_path: str, test, problem, checker: Checker, cpu: Optional[int] = None) -> Execution:
+    """Запуск через форк-сервер: процессорное время и пиковая память берутся из wait4."""
+    # Вход читается прямо из файла теста, без копии в памяти судьи
+    stdin = os.open(test.input_path, os.O_RDONLY)
+    stdout_read, stdout_write = os.pipe()
+    stderr_read, stderr_write = os.pipe()
+    start_time = time.monotonic()
+    stop = asyncio.Event()
+    child = asyncio.ensure_future(fork_server.run(
+        code_path,
+        [stdin, stdout_write, stderr_write],
+        time_limit=problem.time_limit,
+        memory_limit=problem.memory_limit,
+        wall_time_limit=get_wall_time_limit(problem.time_limit),
+        cpu=cpu,
+        stop=stop,
+    ))
+    stderr_reader = asyncio.ensure_future(read_pipe(stderr_read, STDERR_LIMIT))
+    try:
+        stdout = await read_pipe(stdout_read, USER_OUTPUT_LIMIT, checker, get_output_limit(problem))
+        stderr = await stderr_reader
+        reply = await child
+    except OutputLimitExceeded as error:
+        # Форк-сервер убивает решение, но ресурсы процесса всё равно присылает
+        stop.set()
+        stderr_reader.cancel()
+        await asyncio.gather(stderr_reader, return_exceptions=True)
+        reply = await child
+        observe_forkserver_stages(reply, start_time)
+        return Execution(
+            error.output, b'', reply['cpu_time'], reply['memory'],
+            output_exceeded=True, kill_reason='output_limit',
+        )
+    except BaseException:
+        child.cancel()
+        stderr_reader.cancel()
+        await asyncio.gather(child, stderr_reader, return_exceptions=True)
+        metrics.kills.inc(reason='cancelled')
+        raise
+    observe_forkserver_stages(reply, start_time)
+    returncode = reply['returncode']
+    # SIGXCPU и SIGKILL без нашего участия приходят от RLIMIT_CPU
+    cpu_time_exceeded = (
+        returncode == -signal.SIGXCPU
+        or (returncode == -signal.SIGKILL and reply['killed'] is None)
+    )
+    timed_out = reply['killed'] == 'timeout' or cpu_time_exceeded
+    kill_reason = None
+    if reply['killed'] == 'timeout':
+        kill_reason = 'wall_time'
+    elif cpu_time_exceeded:
+        kill_reason = 'cpu_time'
+    return Execution(
+        stdout,
+        stderr,
+        reply['cpu_time'],
+        reply['memory'],
+        timed_out=timed_out,
+        memory_exceeded=returncode == MEMORY_ERROR_EXIT_CODE,
+        kill_reason=kill_reason,
+    )
+
+
+async def run_test(code_path: str, test, problem) -> Dict:
+    if settings.judge_mode == 'forkserver':
+        execute = execute_forkserver
+    else:
+        execute = execute_subprocess
+    with create_checker(problem, test.output_path) as checker:
+        async with slot_pool.acquire() as slot:
+            execution = await execute(code_path, test, problem, checker, slot.cpu)
+        started = time.perf_counter()
+        accepted = checker.finish()
+        metrics.stage_seconds.observe(checker.elapsed + time.perf_counter() - started, stage='compare')
+
+    if execution.kill_reason is not None:
+        metrics.kills.inc(reason=execution.kill_reason)
+    elif execution.memory_exceeded:
+        metrics.kills.inc(reason='memory')
+    test_result = get_test_result(execution, accepted, test, problem)
+    metrics.test_verdicts.inc(verdict=test_result['verdict'])
+    return test_result
+
+
+def get_test_result(execution: Execution, accepted: bool, test, problem) -> Dict:
+    if execution.timed_out:
+        return make_result(VERDICT_TIME_LIMIT, test.id, execution.time, execution.memory)
+    if execution.memory_exceeded:
+        return make_result(VERDICT_MEMORY_LIMIT, test.id, execution.time, execution.memory)
+    if execution.output_exceeded:
+        # Сохраняем только начало вывода
+        output = execution.stdout.decode(errors='replace')
+        return make_result(VERDICT_OUTPUT_LIMIT, test.id, execution.time, execution.memory, output)
+    if execution.stderr:
+        return make_result(VERDICT_COMPILATION_ERROR, test.id)
+    output = execution.stdout.decode(errors='replace').strip()
+    if not accepted:
+        return make_result(VERDICT_WRONG_ANSWER, test.id, execution.time, execution.memory, output)
+    if execution.time > problem.time_limit:
+        return make_result(VERDICT_TIME_LIMIT, test.id, execution.time, execution.memory)
+    if execution.memory > problem.memory_limit:
+        return make_result(VERDICT_MEMORY_LIMIT, test.id, execution.time, execution.memory)
+    return make_result(VERDICT_OK, test.id, execution.time, execution.memory, output)
+
+
+async def run_tests(
+        code: str,
+        problem,
+        tests,
+        on_result: Optional[Callable[[Dict], Awaitable[None]]] = None,
+) -> List[Dict]:
+    async with WorkDir(code) as workdir:
+        return await run_tests_in(workdir.executable_path, problem, tests, on_result)
+
+
+async def run_tests_in(
+        code_path: str,
+        problem,
+        tests,
+        on_result: Optional[Callable[[Dict], Awaitable[None]]] = None,
+) -> List[Dict]:
+    # Тесты одной посылки идут параллельно, но не больше judge_tests_parallelism за раз
+    parallelism = asyncio.Semaphore(settings.judge_tests_parallelism)
+    # Индекс первого упавшего теста, если посылку проверяют до первой ошибки
+    first_failure = len(tests)
+
+    async def run_indexed(index: int, test):
+        async with parallelism:
+            if index > first_failure:
+                # Тест дождался слота уже после падения более раннего - не запускаем
+                return index, None
+            return index, await run_test(code_path, test, problem)
+
+    tasks = [asyncio.create_task(run_indexed(index, test)) for index, test in enumerate(tests)]
+    try:
+        tests_results = [None] * len(tasks)
+        pending = set(tasks)
+        # Результаты собираем в порядке тестов, а прогресс отдаём по мере готовности
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            ready = []
+            for task in done:
+                if task.cancelled():
+                    continue
+                index, test_result = task.result()
+                if test_result is None or index > first_failure:
+                    continue
+                tests_results[index] = test_result
+                ready.append((index, test_result))
+                if problem.stop_on_first_failure and test_result['verdict'] != VERDICT_OK and index < first_failure:
+                    # Тесты до упавшего доигрываем: среди них может найтись ошибка раньше.
+                    # Более поздние отменяем до записи прогресса, а успевшие
+                    # завершиться считаем пропущенными
+                    first_failure = index
+                    for later_task in tasks[index + 1:]:
+                        later_task.cancel()
+                    for later_index in range(index + 1, len(tests_results)):
+                        tests_results[later_index] = None
+            if on_result is not None:
+                for index, test_result in sorted(ready, key=lambda item: item[0]):
+                    if index <= first_failure:
+                        await on_result(test_result)
+        return skip_remaining(tests, tests_results)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def skip_remaining(tests, tests_results: List[Optional[Dict]]) -> List[Dict]:
+    executed = [test_result for test_result in tests_results if test_result is not None]
+    skipped = len(tests_results) - len(executed)
+    if skipped:
+        metrics.tests_skipped.inc(skipped)
+        metrics.test_verdicts.inc(skipped, verdict=VERDICT_SKIPPED)
+        if executed:
+            average_time = sum(test_result['time'] for test_result in executed) / len(executed)
+            metrics.skipped_time_saved.inc(skipped * average_time)
+    return [
+        test_result if test_result is not None else make_result(VERDICT_SKIPPED, test.id)
+        for test, test_result in zip(tests, tests_results)
+    ]
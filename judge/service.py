@@ -0,0 +1,132 @@
+import hashlib
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemes.problem import UserProblemCreate
+from judge import metrics
+from judge.cache import TestSet, test_set_cache
+from judge.runner import VERDICT_OK, run_tests
+from models.problem import Submission, UserProblem
+from requests.problem import problem_requests, test_requests, user_problem_requests
+
+
+def get_problem_verdict(tests_results: List[Dict]) -> str:
+    # Вердикт задачи - вердикт первого не пройденного теста
+    for test_result in tests_results:
+        if test_result['verdict'] != VERDICT_OK:
+            return test_result['verdict']
+    return VERDICT_OK
+
+
+def get_solution_hash(solution: str) -> str:
+    return hashlib.sha256(solution.encode()).hexdigest()
+
+
+async def reuse_results(
+        user_problem_create: UserProblemCreate,
+        problem,
+        session: AsyncSession,
+) -> Optional[Tuple[UserProblem, int]]:
+    """Если такое же решение уже проверено на текущих тестах, записывает
+    попытку с его вердиктами и возвращает её вместе с числом тестов."""
+    cached = await user_problem_requests.get_cached(
+        problem.id,
+        problem.tests_version,
+        get_solution_hash(user_problem_create.solution),
+        session=session,
+    )
+    if cached is None:
+        return None
+    with metrics.stage_seconds.time(stage='persist'):
+        return await user_problem_requests.copy_attempt(cached, user_problem_create.user_id, session=session)
+
+
+async def get_test_set(problem_id: int, session: AsyncSession) -> TestSet:
+    with metrics.stage_seconds.time(stage='test_fetch'):
+        return await load_test_set(problem_id, session=session)
+
+
+async def load_test_set(problem_id: int, session: AsyncSession) -> TestSet:
+    # Лимиты и тесты задачи берём из кэша, если версия тестов не изменилась
+    tests_version = await problem_requests.get_tests_version(problem_id, session=session)
+    test_set = test_set_cache.get(problem_id, tests_version)
+    if test_set is None:
+        problem = await problem_requests.get(id=problem_id, session=session)
+        tests = await test_requests.get_multi(problem_id=problem_id, session=session)
+        await test_requests.materialize(tests, session=session)
+        test_set = test_set_cache.put(problem, tests)
+    return test_set
+
+
+async def save_results(
+        user_problem_create: UserProblemCreate,
+        tests_results: List[Dict],
+        session: AsyncSession,
+        tests_version: Optional[int] = None,
+) -> UserProblem:
+    with metrics.stage_seconds.time(stage='persist'):
+        return await user_problem_requests.create_with_tests(
+            UserProblemCreate(
+                user_id=user_problem_create.user_id,
+                problem_id=user_problem_create.problem_id,
+                solution=user_problem_create.solution,
+                verdict=get_problem_verdict(tests_results),
+            ),
+            tests_results,
+            session=session,
+            solution_hash=get_solution_hash(user_problem_create.solution),
+            tests_version=tests_version,
+        )
+
+
+async def judge_submission(
+        user_problem_create: UserProblemCreate,
+        session: AsyncSession,
+        on_start: Optional[Callable[[int], Awaitable[None]]] = None,
+        on_result: Optional[Callable[[Dict], Awaitable[None]]] = None,
+) -> Tuple[UserProblem, List[Dict]]:
+    test_set = await get_test_set(user_problem_create.problem_id, session=session)
+    problem = test_set.problem
+    reused = await reuse_results(user_problem_create, problem, session=session)
+    if reused is not None:
+        db_user_problem, tests_count = reused
+        if on_start is not None:
+            await on_start(tests_count)
+        return db_user_problem, []
+    tests = test_set.tests
+    if on_start is not None:
+        await on_start(len(tests))
+    tests_results = await run_tests(user_problem_create.solution, problem, tests, on_result=on_result)
+    db_user_problem = await save_results(
+        user_problem_create,
+        tests_results,
+        session=session,
+        tests_version=problem.tests_version,
+    )
+    return db_user_problem, tests_results
+
+
+async def rejudge_submission(
+        submission: Submission,
+        session: AsyncSession,
+        on_start: Optional[Callable[[int], Awaitable[None]]] = None,
+        on_result: Optional[Callable[[Dict], Awaitable[None]]] = None,
+) -> Optional[UserProblem]:
+    """Перепроверяет попытку submission.user_problem_id на текущих тестах
+    и заменяет её вердикт. None - если попытку уже удалили."""
+    test_set = await get_test_set(submission.problem_id, session=session)
+    problem = test_set.problem
+    tests = test_set.tests
+    if on_start is not None:
+        await on_start(len(tests))
+    tests_results = await run_tests(submission.solution, problem, tests, on_result=on_result)
+    with metrics.stage_seconds.time(stage='persist'):
+        return await user_problem_requests.replace_results(
+            submission.user_problem_id,
+            get_problem_verdict(tests_results),
+            tests_results,
+            tests_version=problem.tests_version,
+            session=session,
+            rejudge_id=submission.rejudge_id,
+        )
@@ -0,0 +1,94 @@
+"""Слоты судьи: ограничение числа одновременно запущенных решений.
+
+Если задан JUDGE_CPU_MASK (например, '2-5,8'), каждый слот закреплён за своим
+ядром из маски: решение работает только на нём, а процесс API (вместе с
+форк-сервером) - только на остальных ядрах. Так соседние решения и обработка
+запросов не сбивают замеры времени друг другу. Если слотов больше, чем ядер
+в маске, слоты делят ядра по кругу.
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Set
+
+from core.config import settings
+from judge import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def parse_cpu_mask(mask: str) -> List[int]:
+    cpus = []
+    for part in mask.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return sorted(set(cpus))
+
+
+def get_judge_cpus() -> List[int]:
+    if not settings.judge_cpu_mask:
+        return []
+    if not hasattr(os, 'sched_setaffinity'):
+        logger.warning('JUDGE_CPU_MASK is ignored: sched_setaffinity is not available')
+        return []
+    available = os.sched_getaffinity(0)
+    cpus = [cpu for cpu in parse_cpu_mask(settings.judge_cpu_mask) if cpu in available]
+    if not cpus:
+        logger.warning('JUDGE_CPU_MASK %r has no available cpus', settings.judge_cpu_mask)
+    return cpus
+
+
+def pin_to_cpu(cpu: Optional[int]) -> None:
+    # Вызывается в дочернем процессе перед запуском решения
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+
+
+class Slot:
+
+    def __init__(self, index: int, cpu: Optional[int]):
+        self.index = index
+        self.cpu = cpu
+
+
+class SlotPool:
+
+    def __init__(self, count: int, cpus: List[int]):
+        self.slots = [Slot(index, cpus[index % len(cpus)] if cpus else None) for index in range(count)]
+        self.cpus: Set[int] = set(cpus)
+        self.free = list(reversed(self.slots))
+        self.semaphore = asyncio.Semaphore(count)
+        metrics.slots_total.set(count)
+        if cpus and count > len(cpus):
+            logger.warning('%s judge slots share %s pinned cpus', count, len(cpus))
+
+    def reserve_cpus(self) -> None:
+        """Убирает ядра слотов из маски текущего процесса (API или воркера)."""
+        if not self.cpus:
+            return
+        rest = os.sched_getaffinity(0) - self.cpus
+        if rest:
+            os.sched_setaffinity(0, rest)
+        else:
+            logger.warning('JUDGE_CPU_MASK covers all cpus, API process is not moved off judge cpus')
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Slot]:
+        async with self.semaphore:
+            # Свободный слот есть всегда: семафор пускает не больше len(slots) задач
+            slot = self.free.pop()
+            try:
+                with metrics.slots_busy.track():
+                    yield slot
+            finally:
+                self.free.append(slot)
+
+
+slot_pool = SlotPool(settings.judge_max_processes, get_judge_cpus())
@@ -0,0 +1,74 @@
+"""Хранилище файлов тестов, адресуемое по содержимому.
+
+Файл лежит в <root>/<первые два символа sha256>/<sha256>, так что одинаковые
+входы и ответы разных тестов хранятся один раз, а записанный файл никогда
+не меняется. Воркеры на других машинах должны видеть тот же каталог.
+"""
+import hashlib
+import io
+import os
+import tempfile
+from typing import BinaryIO
+
+from core.config import settings
+
+CHUNK_SIZE = 1024 * 1024
+# Сколько символов большого теста сохраняется в строковых полях Test
+TEST_PREVIEW_SIZE = 2048
+
+
+def get_root_dir() -> str:
+    if settings.judge_test_store_dir:
+        return settings.judge_test_store_dir
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_store')
+
+
+class TestStore:
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], content_hash)
+
+    def exists(self, content_hash: str) -> bool:
+        return os.path.exists(self.path(content_hash))
+
+    def size(self, content_hash: str) -> int:
+        return os.path.getsize(self.path(content_hash))
+
+    def read_preview(self, content_hash: str, size: int) -> str:
+        with open(self.path(content_hash), 'rb') as test_file:
+            preview = test_file.read(size).decode(errors='replace')
+        return preview[:size]
+
+    def put(self, data: bytes) -> str:
+        return self.put_file(io.BytesIO(data))
+
+    def put_file(self, source: BinaryIO) -> str:
+        # Копируем частями во временный файл, считая хэш на ходу
+        os.makedirs(self.root, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+        try:
+            sha256 = hashlib.sha256()
+            with open(fd, 'wb') as temp_file:
+                while chunk := source.read(CHUNK_SIZE):
+                    sha256.update(chunk)
+                    temp_file.write(chunk)
+            content_hash = sha256.hexdigest()
+            path = self.path(content_hash)
+            if os.path.exists(path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(temp_path, 0o444)
+                # Переименование атомарно: читатель видит либо весь файл, либо ничего
+                os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return content_hash
+
+
+test_store = TestStore(get_root_dir())
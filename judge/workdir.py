@@ -0,0 +1,81 @@
+import asyncio
+import os
+import py_compile
+import shutil
+import tempfile
+from typing import Optional
+
+import psutil
+
+from core.config import settings
+from judge import metrics
+
+WORKDIR_PREFIX = 'judge-'
+SOURCE_NAME = 'solution.py'
+COMPILED_NAME = 'solution.pyc'
+
+
+def get_base_dir() -> str:
+    # По умолчанию - tmpfs, чтобы исходник и .pyc не трогали диск
+    if settings.judge_work_dir:
+        return settings.judge_work_dir
+    if os.path.isdir('/dev/shm'):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+class WorkDir:
+    """Рабочая папка посылки: исходник и байт-код пишутся один раз на все тесты."""
+
+    def __init__(self, code: str):
+        self.code = code
+        self.path: Optional[str] = None
+        self.source_path: Optional[str] = None
+        self.compiled_path: Optional[str] = None
+
+    @property
+    def executable_path(self) -> str:
+        return self.compiled_path or self.source_path
+
+    def create(self) -> None:
+        self.path = tempfile.mkdtemp(prefix=f'{WORKDIR_PREFIX}{os.getpid()}-', dir=get_base_dir())
+        self.source_path = os.path.join(self.path, SOURCE_NAME)
+        with open(self.source_path, 'w', encoding='utf-8') as source:
+            source.write(self.code)
+        try:
+            self.compiled_path = py_compile.compile(
+                self.source_path,
+                cfile=os.path.join(self.path, COMPILED_NAME),
+                doraise=True,
+            )
+        except py_compile.PyCompileError:
+            # Синтаксическую ошибку покажет сам запуск - вердикт как и раньше
+            self.compiled_path = None
+
+    def remove(self) -> None:
+        if self.path is not None:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.path = None
+
+    async def __aenter__(self) -> 'WorkDir':
+        try:
+            with metrics.stage_seconds.time(stage='source_write'):
+                await asyncio.to_thread(self.create)
+        except BaseException:
+            self.remove()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.remove()
+
+
+def remove_orphaned_workdirs() -> None:
+    # Папки процессов, убитых посреди проверки (SIGKILL, OOM), finally не удалит
+    base_dir = get_base_dir()
+    for name in os.listdir(base_dir):
+        if not name.startswith(WORKDIR_PREFIX):
+            continue
+        pid = name[len(WORKDIR_PREFIX):].split('-', 1)[0]
+        if pid.isdigit() and not psutil.pid_exists(int(pid)):
+            shutil.rmtree(os.path.join(base_dir, name), ignore_errors=True)
@@ -0,0 +1,178 @@
+"""Воркер проверки решений.
+
+Забирает посылки из таблицы submission, прогоняет тесты и сохраняет
+результаты. Запускается внутри API (JUDGE_QUEUE_WORKERS) или отдельно:
+
+    python -m judge.worker --workers 8
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+from typing import List
+
+from app.schemes.problem import UserProblemCreate
+from core.config import settings
+from db.session import async_session
+from judge.forkserver import fork_server
+from judge import metrics
+from judge.queue import LANES, PRIORITY_REJUDGE, STATUS_DONE, STATUS_FAILED, submission_added
+from judge.service import judge_submission, rejudge_submission
+from judge.slots import slot_pool
+from judge.workdir import remove_orphaned_workdirs
+from models.problem import Submission
+from requests.problem import submission_requests
+
+logger = logging.getLogger(__name__)
+
+
+async def process_submission(submission: Submission) -> None:
+    async with async_session() as session:
+        tests_results = []
+        progress = {'total': 0, 'written_at': 0.0}
+
+        async def on_start(tests_total: int) -> None:
+            progress['total'] = tests_total
+            await submission_requests.set_tests_total(submission.id, tests_total, session=session)
+
+        async def on_result(test_result) -> None:
+            # Вывод решения в промежуточные результаты не попадает: он есть в итоговых
+            tests_results.append({**test_result, 'user_output': None})
+            # Прогресс пишем не после каждого теста, а раз в judge_progress_interval
+            # и после последнего теста: иначе каждый тест стоил бы UPDATE и commit
+            now = time.monotonic()
+            if (now - progress['written_at'] < settings.judge_progress_interval
+                    and len(tests_results) < progress['total']):
+                return
+            progress['written_at'] = now
+            await submission_requests.set_tests_results(submission.id, tests_results, session=session)
+
+        try:
+            if submission.rejudge_id is not None:
+                db_user_problem = await rejudge_submission(
+                    submission,
+                    session=session,
+                    on_start=on_start,
+                    on_result=on_result,
+                )
+            else:
+                db_user_problem, _ = await judge_submission(
+                    UserProblemCreate(
+                        user_id=submission.user_id,
+                        problem_id=submission.problem_id,
+                        solution=submission.solution,
+                    ),
+                    session=session,
+                    on_start=on_start,
+                    on_result=on_result,
+                )
+        except asyncio.CancelledError:
+            # Воркер останавливают - возвращаем посылку в очередь для другого воркера
+            await session.rollback()
+            await asyncio.shield(submission_requests.release(submission.id, session=session))
+            raise
+        except Exception:
+            logger.exception('Judging submission %s failed', submission.id)
+            await session.rollback()
+            await submission_requests.finish(submission.id, STATUS_FAILED, session=session)
+            metrics.submission_verdicts.inc(verdict=STATUS_FAILED)
+            return
+
+        if db_user_problem is None:
+            # Перепроверяемую попытку удалили, пока посылка ждала в очереди
+            await submission_requests.finish(submission.id, STATUS_DONE, session=session)
+            return
+        await submission_requests.finish(
+            submission.id,
+            STATUS_DONE,
+            verdict=db_user_problem.verdict,
+            user_problem_id=db_user_problem.id,
+            session=session,
+        )
+        metrics.submission_verdicts.inc(verdict=db_user_problem.verdict)
+
+
+class JudgeWorker:
+
+    def __init__(self):
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.tasks: List[asyncio.Task] = []
+        self.stale_checked_at = 0.0
+
+    def start(self, workers_count: int) -> None:
+        remove_orphaned_workdirs()
+        # Форк-сервер запускается позже и унаследует маску без ядер судьи
+        slot_pool.reserve_cpus()
+        self.tasks = [asyncio.create_task(self.run()) for _ in range(workers_count)]
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        await fork_server.stop()
+
+    async def claim(self):
+        async with async_session() as session:
+            submission = await submission_requests.claim(
+                worker=self.name,
+                session=session,
+                # Перепроверки не занимают все слоты - живым посылкам всегда есть место
+                lane_limits={PRIORITY_REJUDGE: settings.judge_rejudge_concurrency},
+            )
+            if submission is not None:
+                wait = (submission.started_at - submission.created_at).total_seconds()
+                metrics.stage_seconds.observe(wait, stage='queue_wait')
+                metrics.queue_wait_seconds.observe(wait, lane=LANES.get(submission.priority, 'unknown'))
+            if submission is None and time.monotonic() - self.stale_checked_at > settings.judge_poll_interval * 10:
+                self.stale_checked_at = time.monotonic()
+                requeued = await submission_requests.requeue_stale(settings.judge_stale_timeout, session=session)
+                if requeued:
+                    logger.warning('Requeued %s stale submissions', requeued)
+        return submission
+
+    async def run(self) -> None:
+        while True:
+            try:
+                submission = await self.claim()
+            except Exception:
+                logger.exception('Claiming submission failed')
+                await asyncio.sleep(settings.judge_poll_interval)
+                continue
+            if submission is None:
+                submission_added.clear()
+                try:
+                    await asyncio.wait_for(submission_added.wait(), timeout=settings.judge_poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await process_submission(submission)
+
+
+judge_worker = JudgeWorker()
+
+
+async def serve(workers_count: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    judge_worker.start(workers_count)
+    logger.info('Judge worker %s started with %s slots', judge_worker.name, workers_count)
+    await stop.wait()
+    await judge_worker.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Воркер проверки решений')
+    parser.add_argument('--workers', type=int, default=settings.judge_queue_workers)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(args.workers))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import List, Optional
 
 from fastapi_users.db import SQLAlchemyBaseUserTable
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from db.base_class import Base
@@ -90,7 +90,7 @@ class CardCategory(Base):
         'Card',
         back_populates='category',
         cascade='all',
-        lazy='selectin'
+        lazy='raise'
     )
 
     parent_category: Mapped['Optional[CardCategory]'] = relationship(
@@ -103,3 +103,23 @@ class CardCategory(Base):
         cascade='all',
         lazy='selectin'
     )
+
+
+class CardCategoryClosure(Base):
+    __tablename__ = "card_category_closure"
+    __table_args__ = (
+        UniqueConstraint('ancestor_id', 'descendant_id'),
+        Index('ix_card_category_closure_descendant_id', 'descendant_id'),
+    )
+
+    ancestor_id: Mapped[int] = mapped_column(ForeignKey(
+            "card_category.id",
+            ondelete='CASCADE'
+        )
+    )
+    descendant_id: Mapped[int] = mapped_column(ForeignKey(
+            "card_category.id",
+            ondelete='CASCADE'
+        )
+    )
+    depth: Mapped[int] = mapped_column(Integer, default=0)
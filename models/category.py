@@ -0,0 +1,13 @@
+from sqlalchemy import String, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.base_class import Base
+
+
+class CategoryVersion(Base):
+    # Версия дерева категорий: растёт при каждом изменении категорий,
+    # по ней процессы узнают, что их кэш дерева устарел
+    __tablename__ = "category_version"
+
+    tree: Mapped[str] = mapped_column(String(64), unique=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
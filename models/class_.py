@@ -14,7 +14,7 @@ class Class(Base):
         'User',
         back_populates='class_',
         cascade='all',
-        lazy='selectin'
+        lazy='raise'
     )
     
 
@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import List, Optional
 
 from fastapi_users.db import SQLAlchemyBaseUserTable
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean, Float, Index, JSON, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from db.base_class import Base
@@ -18,7 +18,16 @@ class Problem(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now())
     memory_limit: Mapped[Optional[int]] = mapped_column(Integer)
     time_limit: Mapped[Optional[int]] = mapped_column(Integer)
+    # Лимит вывода в байтах; если не задан - JUDGE_OUTPUT_LIMIT
+    output_limit: Mapped[Optional[int]] = mapped_column(Integer)
+    # Способ сравнения вывода с ответом, см. judge.checker
+    checker: Mapped[str] = mapped_column(String(16), default='exact')
+    checker_tolerance: Mapped[Optional[float]] = mapped_column(Float)
+    # Как на ICPC: после первого непройденного теста остальные не запускаются
+    stop_on_first_failure: Mapped[bool] = mapped_column(Boolean, default=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Растёт при любом изменении тестов и лимитов - по нему сбрасывается кэш результатов
+    tests_version: Mapped[int] = mapped_column(Integer, default=1)
 
     tests: Mapped[List['Test']] = relationship(
         "Test",
@@ -40,8 +49,11 @@ class Problem(Base):
 class Test(Base):
     __tablename__ = "test"
     problem_id: Mapped[int] = mapped_column(ForeignKey("problem.id"))
+    # Для больших тестов здесь только начало, целиком они лежат в хранилище тестов
     input_data: Mapped[str] = mapped_column(String(2048))
     output_data: Mapped[str] = mapped_column(String(2048))
+    input_hash: Mapped[Optional[str]] = mapped_column(String(64))
+    output_hash: Mapped[Optional[str]] = mapped_column(String(64))
 
     problem: Mapped["Problem"] = relationship(
         "Problem",
@@ -51,12 +63,16 @@ class Test(Base):
         'UserTest',
         back_populates='test',
         cascade='all',
-        lazy='selectin'
+        lazy='raise'
     )
 
 
 class UserProblem(Base):
     __tablename__ = "user_problem"
+    __table_args__ = (
+        Index('ix_user_problem_user_id_problem_id', 'user_id', 'problem_id'),
+        Index('ix_user_problem_problem_id_solution_hash', 'problem_id', 'solution_hash'),
+    )
 
     user_id: Mapped[int] = mapped_column(ForeignKey(
             "user.id",
@@ -71,6 +87,9 @@ class UserProblem(Base):
     solved_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=datetime.now())
     solution: Mapped[Optional[str]] = mapped_column(String(16000))
     attempt: Mapped[int] = mapped_column(Integer, default=1)
+    # sha256 решения и версия тестов, на которой оно проверено
+    solution_hash: Mapped[Optional[str]] = mapped_column(String(64))
+    tests_version: Mapped[Optional[int]] = mapped_column(Integer)
     problem: Mapped['Problem'] = relationship(
         back_populates="user_problems"
     )
@@ -80,6 +99,26 @@ class UserProblem(Base):
     verdict: Mapped[Optional[str]] = mapped_column(String(128))
 
 
+class UserProblemAttempt(Base):
+    """Счётчик попыток пользователя по задаче."""
+    __tablename__ = "user_problem_attempt"
+    __table_args__ = (
+        UniqueConstraint('user_id', 'problem_id'),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey(
+            "user.id",
+            ondelete='CASCADE'
+        )
+    )
+    problem_id: Mapped[int] = mapped_column(ForeignKey(
+            "problem.id",
+            ondelete='CASCADE'
+        )
+    )
+    last_attempt: Mapped[int] = mapped_column(Integer, default=0)
+
+
 class UserTest(Base):
     __tablename__ = "user_test"
 
@@ -101,7 +140,7 @@ class UserTest(Base):
     attempt: Mapped[int] = mapped_column(Integer, default=1)
     verdict: Mapped[Optional[str]] = mapped_column(String(128))
     memory: Mapped[Optional[int]] = mapped_column(Integer, default=0)
-    time: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    time: Mapped[Optional[float]] = mapped_column(Float, default=0)
     user_output: Mapped[Optional[str]] = mapped_column(String(16000), default="Ответа нет")
     test: Mapped['Test'] = relationship(
         "Test",
@@ -119,7 +158,7 @@ class ProblemCategory(Base):
         'Problem',
         back_populates='category',
         cascade='all',
-        lazy='selectin'
+        lazy='raise'
     )
     parent_category: Mapped['ProblemCategory'] = relationship(
         'ProblemCategory',
@@ -132,3 +171,84 @@ class ProblemCategory(Base):
         cascade='all',
         lazy='selectin'
     )
+
+
+# Таблица замыкания дерева: пары (предок, потомок) на любой глубине, включая
+# пару категории с собой. Поддерево категории - строки с её ancestor_id
+class ProblemCategoryClosure(Base):
+    __tablename__ = "problem_category_closure"
+    __table_args__ = (
+        UniqueConstraint('ancestor_id', 'descendant_id'),
+        Index('ix_problem_category_closure_descendant_id', 'descendant_id'),
+    )
+
+    ancestor_id: Mapped[int] = mapped_column(ForeignKey(
+            "problem_category.id",
+            ondelete='CASCADE'
+        )
+    )
+    descendant_id: Mapped[int] = mapped_column(ForeignKey(
+            "problem_category.id",
+            ondelete='CASCADE'
+        )
+    )
+    depth: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class Rejudge(Base):
+    __tablename__ = "rejudge"
+
+    problem_id: Mapped[int] = mapped_column(ForeignKey(
+            "problem.id",
+            ondelete='CASCADE'
+        )
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    tests_version: Mapped[int] = mapped_column(Integer, default=1)
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    changed: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class Submission(Base):
+    __tablename__ = "submission"
+    __table_args__ = (
+        # Порядок выдачи посылок воркерам: полоса, круг пользователя, время отправки
+        Index('ix_submission_status_priority_fair_round', 'status', 'priority', 'fair_round'),
+    )
+
+    user_id: Mapped[int] = mapped_column(ForeignKey(
+            "user.id",
+            ondelete='CASCADE'
+        )
+    )
+    problem_id: Mapped[int] = mapped_column(ForeignKey(
+            "problem.id",
+            ondelete='CASCADE'
+        )
+    )
+    solution: Mapped[str] = mapped_column(String(16000))
+    status: Mapped[str] = mapped_column(String(16), default='queued', index=True)
+    worker: Mapped[Optional[str]] = mapped_column(String(128), default=None)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=None)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=None)
+    tests_total: Mapped[int] = mapped_column(Integer, default=0)
+    tests_done: Mapped[int] = mapped_column(Integer, default=0)
+    # Результаты уже проверенных тестов, пока посылка проверяется
+    tests_results: Mapped[Optional[list]] = mapped_column(JSON, default=None)
+    verdict: Mapped[Optional[str]] = mapped_column(String(128), default=None)
+    priority: Mapped[int] = mapped_column(Integer, default=1)
+    fair_round: Mapped[int] = mapped_column(Integer, default=0)
+    rejudge_id: Mapped[Optional[int]] = mapped_column(ForeignKey(
+            "rejudge.id",
+            ondelete='CASCADE'
+        ),
+        default=None,
+        index=True
+    )
+    user_problem_id: Mapped[Optional[int]] = mapped_column(ForeignKey(
+            "user_problem.id",
+            ondelete='SET NULL'
+        ),
+        default=None
+    )
@@ -2,7 +2,7 @@ import datetime
 from typing import List, Optional
 
 from fastapi_users.db import SQLAlchemyBaseUserTable
-from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from pytz import timezone
 from db.base_class import Base
@@ -64,7 +64,7 @@ class TaskCategory(Base):
         'Task',
         back_populates='category',
         cascade='all',
-        lazy='selectin'
+        lazy='raise'
     )
     parent_category: Mapped['TaskCategory'] = relationship(
         'TaskCategory',
@@ -79,6 +79,26 @@ class TaskCategory(Base):
     )
 
 
+class TaskCategoryClosure(Base):
+    __tablename__ = "task_category_closure"
+    __table_args__ = (
+        UniqueConstraint('ancestor_id', 'descendant_id'),
+        Index('ix_task_category_closure_descendant_id', 'descendant_id'),
+    )
+
+    ancestor_id: Mapped[int] = mapped_column(ForeignKey(
+            "task_category.id",
+            ondelete='CASCADE'
+        )
+    )
+    descendant_id: Mapped[int] = mapped_column(ForeignKey(
+            "task_category.id",
+            ondelete='CASCADE'
+        )
+    )
+    depth: Mapped[int] = mapped_column(Integer, default=0)
+
+
 class DifficultyLevel(Base):
     __tablename__ = "difficulty_level"
     name: Mapped[str] = mapped_column(String(128))
@@ -87,7 +107,7 @@ class DifficultyLevel(Base):
         'Task',
         back_populates='difficulty_level',
         cascade='all',
-        lazy='selectin'
+        lazy='raise'
     )
 
 
@@ -99,7 +119,7 @@ class ImageCategory(Base):
         'TaskImage',
         back_populates='category',
         cascade='all',
-        lazy='selectin'
+        lazy='raise'
     )
 
 
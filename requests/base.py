@@ -1,7 +1,13 @@
+from typing import Dict, FrozenSet, List
+
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import aliased
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.config import settings
+from requests.category_cache import CategoryForestCache
+
 
 class  RequestsBase:
 
@@ -75,3 +81,208 @@ class  RequestsBase:
             .where(self.model.name == name)
         )
         return objs_db.all()
+
+
+class CategoryRequestsBase(RequestsBase):
+    """Категории заданий, карточек и задач: дерево по parent_category_id
+    и таблица замыкания closure_model, которая держится в актуальном состоянии
+    при создании, переносе и удалении категорий. Каждое изменение поднимает
+    версию дерева для кэша forest_cache. item_model - то, что лежит
+    в категориях (по столбцу category_id)."""
+
+    def __init__(self, model, closure_model, item_model):
+        super().__init__(model)
+        self.closure_model = closure_model
+        self.item_model = item_model
+        self.forest_cache = CategoryForestCache(model, settings.category_cache_ttl)
+
+    async def get_descendants(
+            self,
+            category_id: int,
+            session: AsyncSession,
+    ) -> FrozenSet[int]:
+        """Id категории и всех её потомков; для корневой категории - пусто."""
+        forest = await self.forest_cache.get(session)
+        return forest.get_descendants(category_id)
+
+    async def get_multi(
+            self,
+            parent_category_id: int,
+            session: AsyncSession,
+    ):
+        query = select(self.model).where(self.model.id != 0)
+        if parent_category_id is not None:
+            query = query.where(self.model.parent_category_id == parent_category_id)
+        result = await session.execute(query)
+        return result.scalars().all()
+
+    async def get_tree(
+            self,
+            session: AsyncSession,
+            counts: bool = False,
+    ) -> List[Dict]:
+        """Всё дерево без корневой категории одним плоским запросом.
+
+        При counts у каждой вершины есть items (объекты прямо в категории)
+        и total_items (вместе с поддеревом)."""
+        query = (
+            select(self.model.id, self.model.name, self.model.parent_category_id, self.model.level)
+            .where(self.model.id != 0)
+            .order_by(self.model.id)
+        )
+        if counts:
+            query = (
+                query.add_columns(func.count(self.item_model.id))
+                .outerjoin(self.item_model, self.item_model.category_id == self.model.id)
+                .group_by(self.model.id)
+            )
+        rows = (await session.execute(query)).all()
+
+        nodes = {}
+        for row in rows:
+            node = {'id': row.id, 'name': row.name, 'level': row.level, 'children': []}
+            if counts:
+                node['items'] = node['total_items'] = row[4]
+            nodes[row.id] = node
+        roots = []
+        for row in rows:
+            parent = nodes.get(row.parent_category_id)
+            (parent['children'] if parent is not None else roots).append(nodes[row.id])
+
+        if counts:
+            # Обратный порядок обхода в глубину: дети считаются раньше родителей
+            order = []
+            stack = list(roots)
+            while stack:
+                node = stack.pop()
+                order.append(node)
+                stack.extend(node['children'])
+            for node in reversed(order):
+                node['total_items'] += sum(child['total_items'] for child in node['children'])
+        return roots
+
+    async def get_tree_version(self, session: AsyncSession) -> int:
+        forest = await self.forest_cache.get(session)
+        return forest.version
+
+    async def create(
+            self,
+            obj_in,
+            session: AsyncSession,
+    ):
+        obj_in_data = obj_in.dict()
+        category = self.model(**obj_in_data)
+        if obj_in.parent_category_id:
+            parent_category = await session.scalar(
+                select(self.model).where(self.model.id == obj_in.parent_category_id)
+            )
+            category_level = parent_category.level + 1
+            category.level = category_level
+        session.add(category)
+        await session.flush()
+        await self.add_to_closure(category.id, category.parent_category_id, session=session)
+        await self.forest_cache.bump_version(session)
+        await session.commit()
+        self.forest_cache.invalidate()
+        await session.refresh(category)
+        return category
+
+    async def update(
+            self,
+            db_obj,
+            obj_in,
+            session: AsyncSession,
+    ):
+        update_data = obj_in.dict(exclude_unset=True)
+        parent_category_id = update_data.get('parent_category_id', db_obj.parent_category_id)
+        if parent_category_id != db_obj.parent_category_id:
+            await self.move_in_closure(db_obj.id, parent_category_id, session=session)
+        # Изменения таблицы замыкания и версия дерева уходят тем же commit
+        await self.forest_cache.bump_version(session)
+        category = await super().update(db_obj, obj_in, session=session)
+        self.forest_cache.invalidate()
+        return category
+
+    async def remove(
+            self,
+            db_obj,
+            session: AsyncSession
+    ):
+        # Вместе с категорией каскадом удаляется всё поддерево. На SQLite внешние
+        # ключи не проверяются, поэтому строки замыкания удаляем сами
+        closure = self.closure_model
+        await session.execute(
+            delete(closure).where(closure.descendant_id.in_(
+                select(closure.descendant_id).where(closure.ancestor_id == db_obj.id)
+            ))
+        )
+        await self.forest_cache.bump_version(session)
+        category = await super().remove(db_obj, session=session)
+        self.forest_cache.invalidate()
+        return category
+
+    async def is_in_subtree(
+            self,
+            category_id: int,
+            ancestor_id: int,
+            session: AsyncSession,
+    ) -> bool:
+        row = await session.scalar(
+            select(self.closure_model.id).where(
+                self.closure_model.ancestor_id == ancestor_id,
+                self.closure_model.descendant_id == category_id,
+            )
+        )
+        return row is not None
+
+    async def add_to_closure(
+            self,
+            category_id: int,
+            parent_category_id: int,
+            session: AsyncSession,
+    ):
+        closure = self.closure_model
+        # Категория - своя же пара глубины 0, а предки родителя - и её предки
+        await session.execute(
+            insert(closure).values(ancestor_id=category_id, descendant_id=category_id, depth=0)
+        )
+        if parent_category_id:
+            await session.execute(
+                insert(closure).from_select(
+                    ['ancestor_id', 'descendant_id', 'depth'],
+                    select(closure.ancestor_id, literal(category_id), closure.depth + 1)
+                    .where(closure.descendant_id == parent_category_id),
+                )
+            )
+
+    async def move_in_closure(
+            self,
+            category_id: int,
+            parent_category_id: int,
+            session: AsyncSession,
+    ):
+        closure = self.closure_model
+        subtree = select(closure.descendant_id).where(closure.ancestor_id == category_id)
+        # Отрываем поддерево от старых предков: пары внутри поддерева остаются
+        await session.execute(
+            delete(closure).where(
+                closure.descendant_id.in_(subtree),
+                closure.ancestor_id.not_in(subtree),
+            )
+        )
+        if parent_category_id:
+            # Каждый предок нового родителя становится предком каждой вершины поддерева
+            ancestors = aliased(closure)
+            descendants = aliased(closure)
+            await session.execute(
+                insert(closure).from_select(
+                    ['ancestor_id', 'descendant_id', 'depth'],
+                    select(
+                        ancestors.ancestor_id,
+                        descendants.descendant_id,
+                        ancestors.depth + descendants.depth + 1,
+                    )
+                    .join(descendants, descendants.ancestor_id == category_id)
+                    .where(ancestors.descendant_id == parent_category_id),
+                )
+            )
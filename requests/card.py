@@ -4,11 +4,11 @@ from sqlalchemy.sql import and_, not_
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from models.card import Card, CardTask, CardUser, CardCategory
+from models.card import Card, CardTask, CardUser, CardCategory, CardCategoryClosure
 from models.class_ import Class
 from models.task import Task, UserTask
 from models.user import User
-from requests.base import RequestsBase
+from requests.base import CategoryRequestsBase, RequestsBase
 
 
 class CardRequests(RequestsBase):
@@ -22,26 +22,11 @@ class CardRequests(RequestsBase):
             # Если category_id не задан, возвращаем все задания, отсортированные от новых к старым
             query = select(Card).order_by(Card.created_at.desc())
         else:
-            # Получаем все дочерние категории рекурсивно
-            async def get_all_child_categories(category_id: int) -> List[int]:
-                if category_id != 0:
-                    query = select(CardCategory).where(CardCategory.parent_category_id == category_id)
-                    result = await session.execute(query)
-                    child_categories = result.scalars().all()
-                    all_categories = [category_id]
-
-                    for child in child_categories:
-                        all_categories.extend(await get_all_child_categories(child.id))
-                    return all_categories
-                else:
-                    return []
-            # Получаем все категории, включая дочерние
-            all_categories = await get_all_child_categories(category_id)
-
-            # Получаем все задания из этих категорий, отсортированные от новых к старым
+            # Все задания категории и её потомков, отсортированные от новых к старым
+            category_ids = await card_category_requests.get_descendants(category_id, session=session)
             query = (
                 select(Card)
-                .where(Card.category_id.in_(all_categories))
+                .where(Card.category_id.in_(category_ids))
                 .order_by(Card.created_at.desc())
             )
 
@@ -232,35 +217,8 @@ class CardUserRequests(RequestsBase):
 card_user_requests = CardUserRequests(CardUser)
 
 
-class CardCategoryRequests(RequestsBase):
-    async def get_multi(
-            self,
-            parent_category_id: int,
-            session: AsyncSession,
-    ):
-        query = select(self.model).where(self.model.id != 0)
-        if parent_category_id is not None:
-            query = query.where(self.model.parent_category_id == parent_category_id)
-        result = await session.execute(query)
-        return result.scalars().all()
-
-    async def create(
-            self,
-            obj_in,
-            session: AsyncSession,
-    ):
-        obj_in_data = obj_in.dict()
-        category = self.model(**obj_in_data)
-        if obj_in.parent_category_id:
-            parent_category = await session.scalar(
-                select(self.model).where(self.model.id == obj_in.parent_category_id)
-            )
-            category_level = parent_category.level + 1
-            category.level = category_level
-        session.add(category)
-        await session.commit()
-        await session.refresh(category)
-        return category
+class CardCategoryRequests(CategoryRequestsBase):
+    ...
 
 
-card_category_requests = CardCategoryRequests(CardCategory)
\ No newline at end of file
+card_category_requests = CardCategoryRequests(CardCategory, CardCategoryClosure, Card)
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""Кэш деревьев категорий в памяти процесса.
+
+Дерево (id -> дети, id -> все потомки) строится одним запросом и живёт, пока
+не изменится версия дерева в таблице category_version. Версию процесс
+сверяет не чаще раза в CATEGORY_CACHE_TTL секунд, так что изменения из других
+процессов видны с этой задержкой, а свои - сразу: запись категории помечает
+кэш устаревшим.
+"""
+import time
+from typing import Dict, FrozenSet, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.dialect import get_upsert_insert
+from models.category import CategoryVersion
+
+
+class CategoryForest:
+
+    def __init__(self, version: int, parents: Dict[int, Optional[int]]):
+        self.version = version
+        self.children: Dict[int, List[int]] = {category_id: [] for category_id in parents}
+        for category_id, parent_category_id in parents.items():
+            if parent_category_id in self.children and parent_category_id != category_id:
+                self.children[parent_category_id].append(category_id)
+        self.descendants: Dict[int, FrozenSet[int]] = {}
+        # Обход в глубину без рекурсии: потомки вершины собираются после потомков
+        # её детей. Корневая категория (id = 0) в поддеревья не входит
+        stack = [(category_id, False) for category_id in self.children.get(0, ())]
+        while stack:
+            category_id, expanded = stack.pop()
+            if expanded:
+                descendants = {category_id}
+                for child_id in self.children[category_id]:
+                    descendants |= self.descendants[child_id]
+                self.descendants[category_id] = frozenset(descendants)
+            else:
+                stack.append((category_id, True))
+                stack.extend((child_id, False) for child_id in self.children[category_id])
+
+    def get_descendants(self, category_id: int) -> FrozenSet[int]:
+        return self.descendants.get(category_id, frozenset())
+
+
+class CategoryForestCache:
+
+    def __init__(self, model, ttl: float):
+        self.model = model
+        self.tree = model.__tablename__
+        self.ttl = ttl
+        self.forest: Optional[CategoryForest] = None
+        self.checked_at = 0.0
+
+    async def get(self, session: AsyncSession) -> CategoryForest:
+        now = time.monotonic()
+        if self.forest is not None and now - self.checked_at < self.ttl:
+            return self.forest
+        version = await self.get_version(session)
+        if self.forest is None or self.forest.version != version:
+            rows = await session.execute(select(self.model.id, self.model.parent_category_id))
+            self.forest = CategoryForest(version, dict(rows.all()))
+        self.checked_at = now
+        return self.forest
+
+    async def get_version(self, session: AsyncSession) -> int:
+        version = await session.scalar(
+            select(CategoryVersion.version).where(CategoryVersion.tree == self.tree)
+        )
+        return version or 0
+
+    async def bump_version(self, session: AsyncSession) -> None:
+        # Вызывается до commit записи категории, чтобы версия ушла той же транзакцией
+        dialect_insert = get_upsert_insert(session)
+        if dialect_insert is not None:
+            # Строку могли не засеять: вставка и увеличение одним запросом, без гонки
+            await session.execute(
+                dialect_insert(CategoryVersion)
+                .values(tree=self.tree, version=1)
+                .on_conflict_do_update(
+                    index_elements=[CategoryVersion.tree],
+                    set_={'version': CategoryVersion.version + 1},
+                )
+            )
+            return
+        # Остальные базы: строки засевают миграция и create_base_db
+        result = await session.execute(
+            update(CategoryVersion)
+            .where(CategoryVersion.tree == self.tree)
+            .values(version=CategoryVersion.version + 1)
+        )
+        if result.rowcount == 0:
+            session.add(CategoryVersion(tree=self.tree, version=1))
+
+    def invalidate(self) -> None:
+        self.checked_at = 0.0
+        self.forest = None
+
@@ -1,15 +1,20 @@
-from typing import Dict, Union, List, Optional, Tuple
+import asyncio
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, Union, List, Optional, Tuple
 from sqlalchemy.orm import selectinload, joinedload, subqueryload
 from sqlalchemy.sql import and_, not_
-from sqlalchemy import select
+from sqlalchemy import select, update, insert, delete, literal, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from db.dialect import get_upsert_insert
+from judge.test_store import TEST_PREVIEW_SIZE, test_store
 from models.card import Card, CardTask, CardUser, CardCategory
 from models.class_ import Class
-from models.problem import Problem, Test, ProblemCategory, UserProblem, UserTest
+from models.problem import Problem, Test, ProblemCategory, ProblemCategoryClosure, UserProblem, UserProblemAttempt, UserTest, Submission, Rejudge
 from models.task import Task, UserTask
 from models.user import User
-from requests.base import RequestsBase
+from requests.base import CategoryRequestsBase, RequestsBase
 
 class ProblemRequests(RequestsBase):
     async def get_multi(
@@ -22,25 +27,11 @@ class ProblemRequests(RequestsBase):
             # Если category_id не задан, возвращаем все задания, отсортированные от новых к старым
             query = select(Problem).order_by(Problem.created_at.desc())
         else:
-            # Получаем все дочерние категории рекурсивно
-            async def get_all_child_categories(category_id: int) -> List[int]:
-                if category_id != 0:
-                    query = select(ProblemCategory).where(ProblemCategory.parent_category_id == category_id)
-                    result = await session.execute(query)
-                    child_categories = result.scalars().all()
-                    all_categories = [category_id]
-                    for child in child_categories:
-                        all_categories.extend(await get_all_child_categories(child.id))
-                    return all_categories
-                else:
-                    return []
-            # Получаем все категории, включая дочерние
-            all_categories = await get_all_child_categories(category_id)
-
-            # Получаем все задания из этих категорий, отсортированные от новых к старым
+            # Все задания категории и её потомков, отсортированные от новых к старым
+            category_ids = await problem_category_requests.get_descendants(category_id, session=session)
             query = (
                 select(Problem)
-                .where(Problem.category_id.in_(all_categories))
+                .where(Problem.category_id.in_(category_ids))
                 .order_by(Problem.created_at.desc())
             )
 
@@ -52,8 +43,48 @@ class ProblemRequests(RequestsBase):
         result = await session.execute(query)
         return result.scalars().unique().all()
 
+    async def update(
+            self,
+            db_obj,
+            obj_in,
+            session: AsyncSession,
+    ):
+        update_data = obj_in.dict(exclude_unset=True)
+        if any(
+            field in update_data and update_data[field] != getattr(db_obj, field)
+            for field in (
+                'time_limit', 'memory_limit', 'output_limit',
+                'checker', 'checker_tolerance', 'stop_on_first_failure',
+            )
+        ):
+            # С новыми лимитами или чекером старые вердикты могут стать другими
+            await self.bump_tests_version(db_obj.id, session=session)
+        return await super().update(db_obj, obj_in, session=session)
+
+    async def get_tests_version(
+            self,
+            problem_id: int,
+            session: AsyncSession,
+    ) -> Optional[int]:
+        return await session.scalar(select(Problem.tests_version).where(Problem.id == problem_id))
+
+    async def bump_tests_version(
+            self,
+            problem_id: int,
+            session: AsyncSession,
+    ):
+        # Любое изменение тестов или лимитов сбрасывает сохранённые результаты посылок задачи
+        await session.execute(
+            update(Problem)
+            .where(Problem.id == problem_id)
+            .values(tests_version=Problem.tests_version + 1)
+        )
+
 problem_requests = ProblemRequests(Problem)
 
+# Строковые поля теста и хэши их файлов в хранилище
+TEST_DATA_FIELDS = {'input_data': 'input_hash', 'output_data': 'output_hash'}
+
 class TestRequests(RequestsBase):
     async def get_multi(
             self,
@@ -66,39 +97,111 @@ class TestRequests(RequestsBase):
         result = await session.execute(query)
         return result.scalars().all()
 
-test_requests = TestRequests(Test)
+    def store_data(self, db_obj, fields=TEST_DATA_FIELDS) -> None:
+        # Тест, заданный строками, тоже кладём в хранилище - судья читает только файлы
+        for field in fields:
+            setattr(db_obj, TEST_DATA_FIELDS[field], test_store.put(getattr(db_obj, field).encode()))
+
+    def get_changed_data(self, db_obj, update_data: Dict) -> List[str]:
+        return [
+            field for field in TEST_DATA_FIELDS
+            if field in update_data and update_data[field] != getattr(db_obj, field)
+        ]
+
+    def is_file_backed(self, db_obj) -> bool:
+        # У загруженного файлом теста в строковых полях только начало файла
+        for field, hash_field in TEST_DATA_FIELDS.items():
+            content_hash = getattr(db_obj, hash_field)
+            if content_hash is not None and test_store.exists(content_hash) \
+                    and test_store.size(content_hash) > len(getattr(db_obj, field).encode()):
+                return True
+        return False
 
-class ProblemCategoryRequests(RequestsBase):
-    async def get_multi(
+    async def create(
             self,
-            parent_category_id: int,
+            obj_in,
             session: AsyncSession,
     ):
-        query = select(self.model).where(self.model.id != 0)
-        if parent_category_id is not None:
-            query = query.where(self.model.parent_category_id == parent_category_id)
-        result = await session.execute(query)
-        return result.scalars().all()
+        db_obj = self.model(**obj_in.dict())
+        self.store_data(db_obj)
+        session.add(db_obj)
+        await problem_requests.bump_tests_version(db_obj.problem_id, session=session)
+        await session.commit()
+        await session.refresh(db_obj)
+        return db_obj
 
-    async def create(
+    async def update(
             self,
+            db_obj,
             obj_in,
             session: AsyncSession,
     ):
-        obj_in_data = obj_in.dict()
-        category = self.model(**obj_in_data)
-        if obj_in.parent_category_id:
-            parent_category = await session.scalar(
-                select(self.model).where(self.model.id == obj_in.parent_category_id)
-            )
-            category_level = parent_category.level + 1
-            category.level = category_level
-        session.add(category)
+        problem_id = db_obj.problem_id
+        update_data = obj_in.dict(exclude_unset=True)
+        changed_data = self.get_changed_data(db_obj, update_data)
+        for field, value in update_data.items():
+            setattr(db_obj, field, value)
+        # Неизменённые поля не перезаписываем: у большого теста в них только начало файла
+        self.store_data(db_obj, changed_data)
+        session.add(db_obj)
+        await problem_requests.bump_tests_version(problem_id, session=session)
+        if db_obj.problem_id != problem_id:
+            await problem_requests.bump_tests_version(db_obj.problem_id, session=session)
+        await session.commit()
+        await session.refresh(db_obj)
+        return db_obj
+
+    async def remove(
+            self,
+            db_obj,
+            session: AsyncSession
+    ):
+        await problem_requests.bump_tests_version(db_obj.problem_id, session=session)
+        await session.delete(db_obj)
+        await session.commit()
+        return db_obj
+
+    async def create_from_files(
+            self,
+            problem_id: int,
+            input_file: BinaryIO,
+            output_file: BinaryIO,
+            session: AsyncSession,
+    ):
+        input_hash = await asyncio.to_thread(test_store.put_file, input_file)
+        output_hash = await asyncio.to_thread(test_store.put_file, output_file)
+        db_obj = self.model(
+            problem_id=problem_id,
+            input_data=await asyncio.to_thread(test_store.read_preview, input_hash, TEST_PREVIEW_SIZE),
+            output_data=await asyncio.to_thread(test_store.read_preview, output_hash, TEST_PREVIEW_SIZE),
+            input_hash=input_hash,
+            output_hash=output_hash,
+        )
+        session.add(db_obj)
+        await problem_requests.bump_tests_version(problem_id, session=session)
+        await session.commit()
+        await session.refresh(db_obj)
+        return db_obj
+
+    async def materialize(
+            self,
+            tests: List[Test],
+            session: AsyncSession,
+    ):
+        # Тесты, созданные до появления хранилища, переносим туда при первой проверке
+        legacy_tests = [test for test in tests if test.input_hash is None or test.output_hash is None]
+        if not legacy_tests:
+            return
+        for test in legacy_tests:
+            self.store_data(test)
         await session.commit()
-        await session.refresh(category)
-        return category
 
-problem_category_requests = ProblemCategoryRequests(ProblemCategory)
+test_requests = TestRequests(Test)
+
+class ProblemCategoryRequests(CategoryRequestsBase):
+    ...
+
+problem_category_requests = ProblemCategoryRequests(ProblemCategory, ProblemCategoryClosure, Problem)
 
 class UserProblemRequests(RequestsBase):
 
@@ -234,19 +337,473 @@ class UserProblemRequests(RequestsBase):
 
         return problems
 
-    async def get_count_attempts(
+    async def next_attempt(
             self,
+            user_id: int,
+            problem_id: int,
             session: AsyncSession,
-            user_id: Optional[int] = None,
-            problem_id: Optional[int] = None,
-    ):
-        query = select(UserProblem).where(UserProblem.user_id == user_id).where(UserProblem.problem_id == problem_id)
-        user_problems = await session.scalars(query)
-        return len(user_problems.all())
+    ) -> int:
+        # Атомарно увеличиваем счётчик попыток; строка счётчика остаётся
+        # заблокированной до конца транзакции, так что номера не повторяются
+        dialect_insert = get_upsert_insert(session)
+        if dialect_insert is None:
+            return await self.next_attempt_locked(user_id, problem_id, session=session)
+        query = (
+            dialect_insert(UserProblemAttempt)
+            .values(user_id=user_id, problem_id=problem_id, last_attempt=1)
+            .on_conflict_do_update(
+                index_elements=[UserProblemAttempt.user_id, UserProblemAttempt.problem_id],
+                set_={'last_attempt': UserProblemAttempt.last_attempt + 1},
+            )
+            .returning(UserProblemAttempt.last_attempt)
+        )
+        return await session.scalar(query)
+
+    async def next_attempt_locked(
+            self,
+            user_id: int,
+            problem_id: int,
+            session: AsyncSession,
+    ) -> int:
+        # Для баз без upsert: блокируем строку счётчика через SELECT ... FOR UPDATE
+        counter = (UserProblemAttempt.user_id == user_id, UserProblemAttempt.problem_id == problem_id)
+        query = select(UserProblemAttempt.last_attempt).where(*counter).with_for_update()
+        last_attempt = await session.scalar(query)
+        if last_attempt is None:
+            try:
+                async with session.begin_nested():
+                    await session.execute(
+                        insert(UserProblemAttempt)
+                        .values(user_id=user_id, problem_id=problem_id, last_attempt=1)
+                    )
+                return 1
+            except IntegrityError:
+                # Счётчик только что создала параллельная транзакция
+                last_attempt = await session.scalar(query)
+        await session.execute(
+            update(UserProblemAttempt)
+            .where(*counter)
+            .values(last_attempt=last_attempt + 1)
+        )
+        return last_attempt + 1
+
+    async def get_cached(
+            self,
+            problem_id: int,
+            tests_version: int,
+            solution_hash: str,
+            session: AsyncSession,
+    ) -> Optional[UserProblem]:
+        # Последняя проверка такого же решения на той же версии тестов
+        return await session.scalar(
+            select(UserProblem)
+            .where(
+                UserProblem.problem_id == problem_id,
+                UserProblem.solution_hash == solution_hash,
+                UserProblem.tests_version == tests_version,
+            )
+            .order_by(UserProblem.id.desc())
+            .limit(1)
+        )
+
+    async def copy_attempt(
+            self,
+            cached: UserProblem,
+            user_id: int,
+            session: AsyncSession,
+    ) -> Tuple[UserProblem, int]:
+        # Новая попытка с вердиктами из cached, без запуска решения
+        attempt = await self.next_attempt(user_id, cached.problem_id, session=session)
+        db_obj = self.model(
+            user_id=user_id,
+            problem_id=cached.problem_id,
+            solution=cached.solution,
+            verdict=cached.verdict,
+            attempt=attempt,
+            solution_hash=cached.solution_hash,
+            tests_version=cached.tests_version,
+        )
+        session.add(db_obj)
+        columns = ['user_id', 'problem_id', 'test_id', 'verdict', 'time', 'memory', 'attempt', 'user_output']
+        result = await session.execute(
+            insert(UserTest).from_select(
+                columns,
+                select(
+                    literal(user_id),
+                    UserTest.problem_id,
+                    UserTest.test_id,
+                    UserTest.verdict,
+                    UserTest.time,
+                    UserTest.memory,
+                    literal(attempt),
+                    UserTest.user_output,
+                )
+                .where(
+                    UserTest.user_id == cached.user_id,
+                    UserTest.problem_id == cached.problem_id,
+                    UserTest.attempt == cached.attempt,
+                )
+                .order_by(UserTest.id)
+            )
+        )
+        await session.commit()
+        return db_obj, result.rowcount
+
+    async def create_with_tests(
+            self,
+            obj_in,
+            tests_results: List[Dict],
+            session: AsyncSession,
+            solution_hash: Optional[str] = None,
+            tests_version: Optional[int] = None,
+    ) -> UserProblem:
+        # Номер попытки, посылка и результаты всех тестов - в одной транзакции
+        attempt = await self.next_attempt(obj_in.user_id, obj_in.problem_id, session=session)
+        db_obj = self.model(
+            **obj_in.dict(exclude={'attempt'}),
+            attempt=attempt,
+            solution_hash=solution_hash,
+            tests_version=tests_version,
+        )
+        session.add(db_obj)
+        if tests_results:
+            # Один многострочный INSERT вместо commit + refresh на каждый тест
+            await session.execute(
+                insert(UserTest).values(
+                    self.get_user_tests_values(obj_in.user_id, obj_in.problem_id, attempt, tests_results)
+                )
+            )
+        await session.commit()
+        return db_obj
+
+    async def replace_results(
+            self,
+            user_problem_id: int,
+            verdict: str,
+            tests_results: List[Dict],
+            tests_version: int,
+            session: AsyncSession,
+            rejudge_id: Optional[int] = None,
+    ) -> Optional[UserProblem]:
+        # Перепроверка не создаёт новую попытку: вердикт и результаты тестов
+        # попытки заменяются в одной транзакции
+        db_obj = await session.get(self.model, user_problem_id, populate_existing=True)
+        if db_obj is None:
+            return None
+        if rejudge_id is not None and db_obj.verdict != verdict:
+            await session.execute(
+                update(Rejudge)
+                .where(Rejudge.id == rejudge_id)
+                .values(changed=Rejudge.changed + 1)
+            )
+        await session.execute(
+            delete(UserTest)
+            .where(
+                UserTest.user_id == db_obj.user_id,
+                UserTest.problem_id == db_obj.problem_id,
+                UserTest.attempt == db_obj.attempt,
+            )
+        )
+        if tests_results:
+            await session.execute(
+                insert(UserTest).values(
+                    self.get_user_tests_values(db_obj.user_id, db_obj.problem_id, db_obj.attempt, tests_results)
+                )
+            )
+        db_obj.verdict = verdict
+        db_obj.tests_version = tests_version
+        await session.commit()
+        return db_obj
+
+    @staticmethod
+    def get_user_tests_values(
+            user_id: int,
+            problem_id: int,
+            attempt: int,
+            tests_results: List[Dict],
+    ) -> List[Dict]:
+        return [
+            {
+                'user_id': user_id,
+                'problem_id': problem_id,
+                'test_id': test_result['test_id'],
+                'verdict': test_result['verdict'],
+                'time': test_result['time'],
+                'memory': test_result['memory'],
+                'attempt': attempt,
+                'user_output': test_result['user_output'],
+            }
+            for test_result in tests_results
+        ]
 
 user_problem_requests = UserProblemRequests(UserProblem)
 
 class UserTestRequests(RequestsBase):
     ...
 
-user_test_requests = UserTestRequests(UserTest)
\ No newline at end of file
+user_test_requests = UserTestRequests(UserTest)
+
+class SubmissionRequests(RequestsBase):
+
+    async def claim(
+            self,
+            worker: str,
+            session: AsyncSession,
+            lane_limits: Optional[Dict[int, int]] = None,
+    ) -> Optional[Submission]:
+        # Берём посылку из полосы с наибольшим приоритетом, внутри полосы - из
+        # самого раннего круга, внутри круга - самую старую. На PostgreSQL строку
+        # блокирует FOR UPDATE SKIP LOCKED, на SQLite (где блокировок строк нет)
+        # от двойного захвата защищает условие status = 'queued' в UPDATE
+        query = (
+            select(self.model.id)
+            .where(self.model.status == 'queued')
+            .order_by(self.model.priority.desc(), self.model.fair_round, self.model.id)
+            .limit(1)
+        )
+        # Полосы с ограничением числа одновременно проверяемых посылок (перепроверки)
+        # пропускаем, если лимит уже выбран. Лимит мягкий: воркеры, проверившие его
+        # одновременно, могут превысить его на несколько посылок
+        for priority, limit in (lane_limits or {}).items():
+            running = await session.scalar(
+                select(func.count(self.model.id))
+                .where(self.model.status == 'running', self.model.priority == priority)
+            )
+            if running >= limit:
+                query = query.where(self.model.priority != priority)
+        if session.bind.dialect.name != 'sqlite':
+            query = query.with_for_update(skip_locked=True)
+        submission_id = await session.scalar(query)
+        if submission_id is None:
+            await session.commit()
+            return None
+        result = await session.execute(
+            update(self.model)
+            .where(self.model.id == submission_id, self.model.status == 'queued')
+            .values(status='running', worker=worker, started_at=datetime.now())
+        )
+        await session.commit()
+        if result.rowcount != 1:
+            return None
+        return await session.get(self.model, submission_id, populate_existing=True)
+
+    async def next_fair_round(
+            self,
+            user_id: int,
+            priority: int,
+            session: AsyncSession,
+    ) -> int:
+        # Каждая следующая посылка пользователя встаёт на круг позже предыдущей,
+        # поэтому за один круг воркеры берут не больше одной посылки от каждого.
+        # Пользователь без посылок в очереди попадает в текущий круг полосы
+        last_round = await session.scalar(
+            select(func.max(self.model.fair_round))
+            .where(
+                self.model.status == 'queued',
+                self.model.priority == priority,
+                self.model.user_id == user_id,
+            )
+        )
+        if last_round is not None:
+            return last_round + 1
+        current_round = await session.scalar(
+            select(func.min(self.model.fair_round))
+            .where(self.model.status == 'queued', self.model.priority == priority)
+        )
+        return current_round or 0
+
+    async def get_queue_stats(
+            self,
+            session: AsyncSession,
+    ):
+        # Число посылок, пользователей и самая ранняя отправка по полосам и статусам
+        result = await session.execute(
+            select(
+                self.model.priority,
+                self.model.status,
+                func.count(self.model.id),
+                func.count(self.model.user_id.distinct()),
+                func.min(self.model.created_at),
+            )
+            .where(self.model.status.in_(('queued', 'running')))
+            .group_by(self.model.priority, self.model.status)
+        )
+        return result.all()
+
+    async def requeue_stale(
+            self,
+            timeout: int,
+            session: AsyncSession,
+    ) -> int:
+        # Возвращаем в очередь посылки, которые слишком долго висят у упавшего воркера
+        result = await session.execute(
+            update(self.model)
+            .where(
+                self.model.status == 'running',
+                self.model.started_at < datetime.now() - timedelta(seconds=timeout),
+            )
+            .values(status='queued', worker=None, started_at=None, tests_done=0, tests_results=None)
+        )
+        await session.commit()
+        return result.rowcount
+
+    async def release(
+            self,
+            submission_id: int,
+            session: AsyncSession,
+    ):
+        await session.execute(
+            update(self.model)
+            .where(self.model.id == submission_id)
+            .values(status='queued', worker=None, started_at=None, tests_done=0, tests_results=None)
+        )
+        await session.commit()
+
+    async def set_tests_total(
+            self,
+            submission_id: int,
+            tests_total: int,
+            session: AsyncSession,
+    ):
+        await session.execute(
+            update(self.model)
+            .where(self.model.id == submission_id)
+            .values(tests_total=tests_total)
+        )
+        await session.commit()
+
+    async def finish(
+            self,
+            submission_id: int,
+            status: str,
+            session: AsyncSession,
+            verdict: Optional[str] = None,
+            user_problem_id: Optional[int] = None,
+    ):
+        values = {
+            'status': status,
+            'verdict': verdict,
+            'user_problem_id': user_problem_id,
+            'finished_at': datetime.now(),
+        }
+        if status == 'done':
+            # Результаты из кэша приходят без прогресса по тестам, а итоговые
+            # результаты теперь лежат в user_test
+            values['tests_done'] = self.model.tests_total
+            values['tests_results'] = None
+        await session.execute(
+            update(self.model)
+            .where(self.model.id == submission_id)
+            .values(**values)
+        )
+        await session.commit()
+
+    async def set_tests_results(
+            self,
+            submission_id: int,
+            tests_results: List[Dict],
+            session: AsyncSession,
+    ):
+        # Посылку проверяет один воркер, поэтому список пишется целиком
+        await session.execute(
+            update(self.model)
+            .where(self.model.id == submission_id)
+            .values(tests_done=len(tests_results), tests_results=tests_results)
+        )
+        await session.commit()
+
+    async def get_tests_results(
+            self,
+            submission: Submission,
+            session: AsyncSession,
+    ) -> List[Union[UserTest, Dict]]:
+        if submission.status != 'done':
+            return submission.tests_results or []
+        if submission.user_problem_id is None:
+            return []
+        user_problem = await session.get(UserProblem, submission.user_problem_id)
+        if user_problem is None:
+            return []
+        user_tests = await session.scalars(
+            select(UserTest)
+            .where(
+                UserTest.user_id == user_problem.user_id,
+                UserTest.problem_id == user_problem.problem_id,
+                UserTest.attempt == user_problem.attempt,
+            )
+            .order_by(UserTest.id)
+        )
+        return user_tests.all()
+
+submission_requests = SubmissionRequests(Submission)
+
+class RejudgeRequests(RequestsBase):
+
+    async def create_for_problem(
+            self,
+            problem: Problem,
+            priority: int,
+            session: AsyncSession,
+    ) -> Rejudge:
+        # Последние попытки всех пользователей ставятся в очередь одним
+        # INSERT ... SELECT. Круги идут подряд, поэтому одновременные
+        # перепроверки разных задач чередуются, а не ждут друг друга
+        db_obj = self.model(problem_id=problem.id, tests_version=problem.tests_version)
+        session.add(db_obj)
+        await session.flush()
+        latest = (
+            select(UserProblem.user_id, func.max(UserProblem.attempt).label('attempt'))
+            .where(UserProblem.problem_id == problem.id)
+            .group_by(UserProblem.user_id)
+            .subquery()
+        )
+        current_round = await session.scalar(
+            select(func.min(Submission.fair_round))
+            .where(Submission.status == 'queued', Submission.priority == priority)
+        ) or 0
+        attempts = (
+            select(
+                UserProblem.user_id,
+                UserProblem.problem_id,
+                UserProblem.solution,
+                literal('queued'),
+                literal(priority),
+                func.row_number().over(order_by=UserProblem.user_id) + (current_round - 1),
+                literal(datetime.now()),
+                literal(0),
+                literal(0),
+                literal(db_obj.id),
+                UserProblem.id,
+            )
+            .join(
+                latest,
+                and_(UserProblem.user_id == latest.c.user_id, UserProblem.attempt == latest.c.attempt),
+            )
+            .where(UserProblem.problem_id == problem.id, UserProblem.solution.is_not(None))
+        )
+        result = await session.execute(
+            insert(Submission).from_select(
+                [
+                    'user_id', 'problem_id', 'solution', 'status', 'priority', 'fair_round',
+                    'created_at', 'tests_total', 'tests_done', 'rejudge_id', 'user_problem_id',
+                ],
+                attempts,
+            )
+        )
+        db_obj.total = result.rowcount
+        await session.commit()
+        return db_obj
+
+    async def get_progress(
+            self,
+            rejudge_id: int,
+            session: AsyncSession,
+    ) -> Dict[str, int]:
+        result = await session.execute(
+            select(Submission.status, func.count(Submission.id))
+            .where(Submission.rejudge_id == rejudge_id)
+            .group_by(Submission.status)
+        )
+        return dict(result.all())
+
+rejudge_requests = RejudgeRequests(Rejudge)
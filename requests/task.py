@@ -5,8 +5,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 from sqlalchemy.sql import and_
 from models.card import Card
-from models.task import Task, TaskImage, TaskCategory, ImageCategory, DifficultyLevel, UserTask
-from requests.base import RequestsBase
+from models.task import Task, TaskImage, TaskCategory, TaskCategoryClosure, ImageCategory, DifficultyLevel, UserTask
+from requests.base import CategoryRequestsBase, RequestsBase
 from sqlalchemy import desc
 
 class TaskRequests(RequestsBase):
@@ -22,25 +22,11 @@ class TaskRequests(RequestsBase):
             result = await session.execute(query)
             return result.scalars().unique().all()
     
-        # Получаем все дочерние категории рекурсивно
-        async def get_all_child_categories(category_id: int) -> List[int]:
-            if category_id != 0:
-                query = select(TaskCategory).where(TaskCategory.parent_category_id == category_id)
-                result = await session.execute(query)
-                child_categories = result.scalars().all()
-                all_categories = [category_id]
-                for child in child_categories:
-                    all_categories.extend(await get_all_child_categories(child.id))
-                return all_categories
-            else:
-                return []
-        # Получаем все категории, включая дочерние
-        all_categories = await get_all_child_categories(category_id)
-    
-        # Получаем все задания из этих категорий, отсортированные от новых к старым
+        # Все задания категории и её потомков, отсортированные от новых к старым
+        category_ids = await task_category_requests.get_descendants(category_id, session=session)
         query = (
             select(Task)
-            .where(Task.category_id.in_(all_categories))
+            .where(Task.category_id.in_(category_ids))
             .order_by(Task.created_at.desc())
         )
         result = await session.execute(query)
@@ -71,39 +57,11 @@ class TaskImageRequests(RequestsBase):
 task_image_requests = TaskImageRequests(TaskImage)
 
 
-class TaskCategoryRequests(RequestsBase):
+class TaskCategoryRequests(CategoryRequestsBase):
+    ...
 
-    async def get_multi(
-            self,
-            parent_category_id: int,
-            session: AsyncSession,
-    ):
-        query = select(self.model).where(self.model.id != 0)
-        if parent_category_id is not None:
-            query = query.where(self.model.parent_category_id == parent_category_id)
-        result = await session.execute(query)
-        return result.scalars().all()
 
-    async def create(
-            self,
-            obj_in,
-            session: AsyncSession,
-    ):
-        obj_in_data = obj_in.dict()
-        category = self.model(**obj_in_data)
-        if obj_in.parent_category_id:
-            parent_category = await session.scalar(
-                select(self.model).where(self.model.id == obj_in.parent_category_id)
-            )
-            category_level = parent_category.level + 1
-            category.level = category_level
-        session.add(category)
-        await session.commit()
-        await session.refresh(category)
-        return category
-
-
-task_category_requests = TaskCategoryRequests(TaskCategory)
+task_category_requests = TaskCategoryRequests(TaskCategory, TaskCategoryClosure, Task)
 
 
 class ImageCategoryRequests(RequestsBase):
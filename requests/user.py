@@ -2,7 +2,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.class_ import Class
-from models.user import User
+from models.user import User, Status
 from requests.base import RequestsBase
 from sqlalchemy import select, asc
 from sqlalchemy.orm import joinedload
@@ -22,5 +22,17 @@ class UserRequests(RequestsBase):
         result = await session.execute(query)
         return result.unique().scalars().all()
 
+    async def get_level(
+            self,
+            user_id: int,
+            session: AsyncSession,
+    ) -> int:
+        level = await session.scalar(
+            select(Status.level)
+            .join(User, User.status_id == Status.id)
+            .where(User.id == user_id)
+        )
+        return level or 0
+
 
 user_requests = UserRequests(User)
\ No newline at end of file
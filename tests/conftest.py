@@ -0,0 +1,57 @@
+import asyncio
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Настройки читаются при импорте core.config, поэтому окружение задаём до импорта приложения
+TEMP_DIR = tempfile.mkdtemp(prefix='school_tests_')
+os.environ['DATABASE_URL'] = f'sqlite+aiosqlite:///{os.path.join(TEMP_DIR, "test.db")}'
+os.environ['JUDGE_TEST_STORE_DIR'] = os.path.join(TEMP_DIR, 'test_store')
+os.environ['JUDGE_WORK_DIR'] = TEMP_DIR
+os.environ['JUDGE_QUEUE_WORKERS'] = '0'
+for name, value in {
+    'API_TOKEN': 'token',
+    'ADMIN_ID': '1',
+    'SECRET_JWT': 'secret',
+    'SECRET_ADMIN_JWT': 'secret',
+    'SECRET_USER': 'secret',
+    'SERVER_ID': 'http://localhost',
+    'IP_ADDRESS': 'http://127.0.0.1',
+    'FIRST_CLASS_NAME': '11А',
+}.items():
+    os.environ.setdefault(name, value)
+for role in ('SUPERADMIN', 'USER', 'TEACHER'):
+    os.environ.setdefault(f'FIRST_{role}_EMAIL', f'{role.lower()}@example.com')
+    os.environ.setdefault(f'FIRST_{role}_PASSWORD', 'password')
+    os.environ.setdefault(f'FIRST_{role}_LAST_NAME', 'Иванов')
+    os.environ.setdefault(f'FIRST_{role}_FIRST_NAME', 'Иван')
+    os.environ.setdefault(f'FIRST_{role}_MIDDLE_NAME', 'Иванович')
+    os.environ.setdefault(f'FIRST_{role}_CLASS_ID', '1')
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from core.base import Base
+from core.user_manager import current_superuser, current_user
+from db.session import engine
+from models.user import User
+
+
+async def create_tables():
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    # Соединения привязаны к циклу событий, а у TestClient он свой
+    await engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def client():
+    asyncio.run(create_tables())
+    app.dependency_overrides[current_user] = lambda: User(id=1)
+    app.dependency_overrides[current_superuser] = lambda: User(id=1)
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+    shutil.rmtree(TEMP_DIR, ignore_errors=True)
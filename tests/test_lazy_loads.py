@@ -0,0 +1,84 @@
+"""Коллекции, объявленные lazy='raise', не должны читаться без явной загрузки.
+
+Если обработчик трогает такую коллекцию, SQLAlchemy бросает InvalidRequestError,
+а если схема ответа - FastAPI заворачивает её в ResponseValidationError.
+TestClient пробрасывает обе ошибки в тест.
+"""
+import pytest
+from fastapi.exceptions import ResponseValidationError
+from sqlalchemy.exc import InvalidRequestError
+
+ENDPOINTS = (
+    '/class/',
+    '/class/1',
+    '/difficulty_level/',
+    '/difficulty_level/1',
+    '/task_category/',
+    '/task_category/tree?counts=true',
+    '/task_category/{task_category_id}',
+    '/task/',
+    '/task/?category_id={task_category_id}',
+    '/task/{task_id}',
+    '/task/card/?card_id={card_id}',
+    '/card_category/',
+    '/card_category/tree?counts=true',
+    '/card_category/{card_category_id}',
+    '/card/',
+    '/card/?category_id={card_category_id}',
+    '/card/{card_id}',
+    '/card_task/?card_id={card_id}',
+    '/problem_category/',
+    '/problem_category/tree?counts=true',
+    '/problem_category/{problem_category_id}',
+    '/problem/',
+    '/problem/?category_id={problem_category_id}',
+    '/problem/{problem_id}',
+    '/test/?problem_id={problem_id}',
+    '/test/{test_id}',
+)
+
+
+@pytest.fixture(scope='module')
+def objects(client):
+    def create(path: str, **data) -> dict:
+        response = client.post(path, json=data)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    task_category_id = create('/task_category/', name='Алгебра', parent_category_id=0)['id']
+    task_id = create('/task/', name='Задача', answer='42', category_id=task_category_id, difficulty_level_id=1)['id']
+    card_category_id = create('/card_category/', name='Контрольные', parent_category_id=0)['id']
+    card_id = create('/card/', name='Карточка', category_id=card_category_id)['id']
+    create('/card_task/', card_id=card_id, task_id=task_id)
+    problem_category_id = create('/problem_category/', name='Строки', parent_category_id=0)['id']
+    problem_id = create(
+        '/problem/',
+        name='Сумма',
+        description='Сложите два числа',
+        difficulty_level_id=1,
+        category_id=problem_category_id,
+        memory_limit=64 * 1024 * 1024,
+        time_limit=1,
+    )['id']
+    test_id = create('/test/', problem_id=problem_id, input_data='1 2', output_data='3')['id']
+    return {
+        'task_category_id': task_category_id,
+        'task_id': task_id,
+        'card_category_id': card_category_id,
+        'card_id': card_id,
+        'problem_category_id': problem_category_id,
+        'problem_id': problem_id,
+        'test_id': test_id,
+    }
+
+
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+def test_no_unplanned_lazy_load(client, objects, endpoint):
+    path = endpoint.format(**objects)
+    try:
+        response = client.get(path)
+    except (InvalidRequestError, ResponseValidationError) as error:
+        if "lazy='raise'" not in str(error):
+            raise
+        pytest.fail(f'{path}: незапланированная ленивая загрузка: {error}')
+    assert response.status_code == 200, response.text